@@ -1,2 +1,2 @@
 # Backend package marker
-__all__ = ["app", "db", "worker", "ws", "validation", "solvers"]
\ No newline at end of file
+__all__ = ["app", "db", "worker", "ws", "validation", "solvers", "static_files", "responses", "db_writer"]
\ No newline at end of file
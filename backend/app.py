@@ -1,6 +1,9 @@
-from fastapi import FastAPI, HTTPException, WebSocket, BackgroundTasks
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, HTTPException, WebSocket, BackgroundTasks, Header, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+import asyncio
 import uuid
 from typing import List, Any, Dict, Optional
 from pathlib import Path
@@ -8,10 +11,35 @@ import logging
 import numpy as np
 from .validation import validate_job_request
 from .db import init_db, save_job_request
+from .static_files import CachedStaticFiles
+from .responses import FastJSONResponse, dumps
 from .worker.manager import enqueue_job
-from .parser.parser import MathematicaParser
+from .parser.parser import parse_cached
+from . import ws
 
-app = FastAPI(title="Equation Phase Portrait Tool API")
+app = FastAPI(title="Equation Phase Portrait Tool API", default_response_class=FastJSONResponse)
+# JSON of float arrays and the JS/HTML bundle compress well; level 6 keeps CPU cost moderate
+# on large /slope_field and /results payloads.
+app.add_middleware(GZipMiddleware, minimum_size=512, compresslevel=6)
+
+# Health probes are frequent and constant; answer them with pre-encoded bytes before any
+# other middleware, routing, validation or JSON encoding runs.
+_HEALTH_BODY = b'{"status":"ok"}'
+_HEALTH_HEADERS = [(b"content-type", b"application/json"), (b"content-length", str(len(_HEALTH_BODY)).encode())]
+
+class HealthCheckMiddleware:
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "http" and scope["path"] == "/health" and scope["method"] == "GET":
+            await send({"type": "http.response.start", "status": 200, "headers": _HEALTH_HEADERS})
+            await send({"type": "http.response.body", "body": _HEALTH_BODY})
+            return
+        await self.app(scope, receive, send)
+
+# added last so it is the outermost middleware
+app.add_middleware(HealthCheckMiddleware)
  
 # Two possible frontend locations:
 #  - Packaged static files included in the Python package at backend/static (used when installed from wheel)
@@ -23,7 +51,7 @@ import site
 PACKAGED_FRONTEND: Path = None
 for p in site.getsitepackages():
     candidate = Path(p) / "backend" / "static"
-    if candidate.exists() and candidate.is_dir():
+    if candidate.is_dir():
         PACKAGED_FRONTEND = candidate
         break
 if PACKAGED_FRONTEND is None:
@@ -31,6 +59,14 @@ if PACKAGED_FRONTEND is None:
     PACKAGED_FRONTEND = Path(__file__).resolve().parent / "static"
 
 DEV_FRONTEND = Path(__file__).resolve().parent.parent / "frontend" / "dist"
+
+# The directory actually served, resolved once at import so startup does no probing.
+FRONTEND_DIR: Optional[Path] = None
+FRONTEND_KIND = ""
+if PACKAGED_FRONTEND.is_dir():
+    FRONTEND_DIR, FRONTEND_KIND = PACKAGED_FRONTEND, "packaged"
+elif DEV_FRONTEND.is_dir():
+    FRONTEND_DIR, FRONTEND_KIND = DEV_FRONTEND, "developer"
 logger = logging.getLogger(__name__)
 
 @app.on_event("startup")
@@ -38,16 +74,13 @@ def startup_event():
     # Initialize SQLite DB for job persistence
     init_db()
 
-    # Mount frontend static files from packaged location if present, otherwise fall back to developer build
+    # Mount frontend static files from the location resolved at import time
+    if FRONTEND_DIR is None:
+        logger.warning(f"Frontend not found in packaged location {PACKAGED_FRONTEND} or dev location {DEV_FRONTEND}; static mount disabled.")
+        return
     try:
-        if PACKAGED_FRONTEND and PACKAGED_FRONTEND.exists() and PACKAGED_FRONTEND.is_dir():
-            app.mount("/", StaticFiles(directory=str(PACKAGED_FRONTEND), html=True), name="frontend")
-            logger.info(f"Serving packaged frontend from: {PACKAGED_FRONTEND}")
-        elif DEV_FRONTEND.exists() and DEV_FRONTEND.is_dir():
-            app.mount("/", StaticFiles(directory=str(DEV_FRONTEND), html=True), name="frontend")
-            logger.info(f"Serving developer frontend from: {DEV_FRONTEND}")
-        else:
-            logger.warning(f"Frontend not found in packaged location {PACKAGED_FRONTEND} or dev location {DEV_FRONTEND}; static mount disabled.")
+        app.mount("/", CachedStaticFiles(directory=str(FRONTEND_DIR), html=True), name="frontend")
+        logger.info(f"Serving {FRONTEND_KIND} frontend from: {FRONTEND_DIR}")
     except Exception as e:
         logger.warning(f"Failed to mount frontend static files: {e}")
 
@@ -73,24 +106,43 @@ class SlopeFieldRequest(BaseModel):
 
 jobs = {}
 
+# Clients that send "Accept: application/octet-stream" to /slope_field receive the grid as one
+# little-endian float32 buffer of shape X-Array-Shape, rows ordered as in X-Array-Fields.
+BINARY_MEDIA_TYPE = "application/octet-stream"
+
+# Interval between SSE comment lines that keep idle proxies from closing /events streams.
+SSE_KEEPALIVE_INTERVAL = 21.0
+
+# Upper bound on how long a WebSocket client waits for its job to reach a terminal state.
+WS_JOB_WAIT_TIMEOUT = 600.0
+
+# Normally answered by HealthCheckMiddleware; the route remains for the OpenAPI schema.
 @app.get("/health")
 def health():
-    return {"status":"ok"}
+    return Response(content=_HEALTH_BODY, media_type="application/json")
 
 @app.post("/submit")
 async def submit_job(req: JobRequest, background_tasks: BackgroundTasks):
-    # validate input and raise HTTPException with Problem Details on failure
-    validate_job_request(req.dict())
+    data = req.dict()
+    # validate input and raise HTTPException with Problem Details on failure; parsing the
+    # equations is CPU work, so it runs in the threadpool instead of on the event loop
+    await run_in_threadpool(validate_job_request, data)
 
     job_id = str(uuid.uuid4())
-    # persist request to DB immediately
-    save_job_request(job_id, req.dict())
+    # persist request to DB (queued to the background writer, does not block)
+    save_job_request(job_id, data)
 
     # mark in-memory jobs mapping for quick status checks (kept for backward compatibility)
-    jobs[job_id] = {"status": "queued", "request": req.dict()}
+    # "done" is set by the worker (from its thread, via "loop") once the job finishes or fails
+    jobs[job_id] = {
+        "status": "queued",
+        "request": data,
+        "done": asyncio.Event(),
+        "loop": asyncio.get_running_loop(),
+    }
 
     # enqueue the real worker task (enqueue_job will persist status/results)
-    background_tasks.add_task(enqueue_job, job_id, req.dict())
+    background_tasks.add_task(enqueue_job, job_id, data)
 
     return {"job_id": job_id}
 
@@ -111,72 +163,139 @@ def job_status(job_id:str):
 def job_results(job_id:str):
     if job_id not in jobs or "result" not in jobs[job_id]:
         raise HTTPException(404,"result not found")
-    return jobs[job_id]["result"]
+    # the result holds ndarrays: serialize them directly rather than via jsonable_encoder
+    return FastJSONResponse(jobs[job_id]["result"])
+
+def _state_grid(axes: List[np.ndarray], indexing: str) -> np.ndarray:
+    """
+    Build the (ndim, N) array of grid states in one preallocated buffer: each row is
+    filled in place from a broadcast (non-copying) meshgrid view.
+    """
+    views = np.meshgrid(*axes, indexing=indexing, copy=False)
+    shape = views[0].shape
+    grid = np.empty((len(axes), views[0].size), dtype=float)
+    for row, view in zip(grid, views):
+        row.reshape(shape)[...] = view
+    return grid
 
+def _slope_field_response(fields: Dict[str, np.ndarray], accept: Optional[str]):
+    if accept and BINARY_MEDIA_TYPE in accept:
+        names = list(fields)
+        # one preallocated float32 buffer; each field is converted straight into its row
+        packed = np.empty((len(names), fields[names[0]].size), dtype="<f4")
+        for row, name in zip(packed, names):
+            row[...] = fields[name]
+        return Response(
+            content=packed.tobytes(),
+            media_type=BINARY_MEDIA_TYPE,
+            headers={
+                "X-Array-Fields": ",".join(names),
+                "X-Array-Shape": ",".join(str(d) for d in packed.shape),
+                "X-Array-Dtype": "float32",
+                # raw floats barely compress; tell GZipMiddleware to leave the body alone
+                "Content-Encoding": "identity",
+            },
+        )
+    # returned as a response object so the arrays skip jsonable_encoder and go straight to orjson
+    return FastJSONResponse(fields)
+
+# Plain def: Starlette runs it in its threadpool, keeping the NumPy grid work off the event loop.
 @app.post("/slope_field")
-def compute_slope_field(req: SlopeFieldRequest):
+def compute_slope_field(req: SlopeFieldRequest, accept: Optional[str] = Header(None)):
     try:
-        parser = MathematicaParser()
-        f, state_vars = parser.parse(req.equations)
+        f, state_vars = parse_cached(req.equations)
         num_vars = len(state_vars)
         if num_vars == 2:
             # 2D
             x = np.linspace(req.x_min, req.x_max, req.grid_size)
             y = np.linspace(req.y_min, req.y_max, req.grid_size)
-            X, Y = np.meshgrid(x, y)
-            X_flat = X.flatten()
-            Y_flat = Y.flatten()
-            U = []
-            V = []
-            for i in range(len(X_flat)):
-                vec = f(0, np.array([X_flat[i], Y_flat[i]]), {})
-                U.append(vec[0])
-                V.append(vec[1])
-            return {
-                "x": X_flat.tolist(),
-                "y": Y_flat.tolist(),
-                "u": U,
-                "v": V
-            }
+            grid = _state_grid([x, y], indexing='xy')
+            # evaluate the whole grid in one call: f broadcasts over states shaped (ndim, N)
+            out = f(0.0, grid, {})
+            return _slope_field_response(
+                {"x": grid[0], "y": grid[1], "u": out[0], "v": out[1]}, accept
+            )
         elif num_vars == 3 and req.z_min is not None and req.z_max is not None:
             # 3D
             x = np.linspace(req.x_min, req.x_max, req.grid_size)
             y = np.linspace(req.y_min, req.y_max, req.grid_size)
             z = np.linspace(req.z_min, req.z_max, req.grid_size)
-            X, Y, Z = np.meshgrid(x, y, z, indexing='ij')
-            X_flat = X.flatten()
-            Y_flat = Y.flatten()
-            Z_flat = Z.flatten()
-            U = []
-            V = []
-            W = []
-            for i in range(len(X_flat)):
-                vec = f(0, np.array([X_flat[i], Y_flat[i], Z_flat[i]]), {})
-                U.append(vec[0])
-                V.append(vec[1])
-                W.append(vec[2])
-            return {
-                "x": X_flat.tolist(),
-                "y": Y_flat.tolist(),
-                "z": Z_flat.tolist(),
-                "u": U,
-                "v": V,
-                "w": W
-            }
+            grid = _state_grid([x, y, z], indexing='ij')
+            out = f(0.0, grid, {})
+            return _slope_field_response(
+                {"x": grid[0], "y": grid[1], "z": grid[2], "u": out[0], "v": out[1], "w": out[2]}, accept
+            )
         else:
             raise HTTPException(400, "Unsupported number of variables or missing z range for 3D")
     except Exception as e:
         raise HTTPException(400, str(e))
 
+def _sse_event(event: str, data: Any) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + dumps(data) + b"\n\n"
+
+def _job_status_payload(job_id: str, job: Dict[str, Any]) -> Dict[str, Any]:
+    payload = {"job_id": job_id, "status": job["status"]}
+    if "error" in job:
+        payload["error"] = job["error"]
+    return payload
+
+async def _job_event_stream(job_id: str, job: Dict[str, Any]):
+    last_status = None
+    while True:
+        if job["status"] != last_status:
+            last_status = job["status"]
+            yield _sse_event("status", _job_status_payload(job_id, job))
+        if job["done"].is_set():
+            if job["status"] == "finished":
+                yield _sse_event("results", job.get("result"))
+            return
+        try:
+            await asyncio.wait_for(job["done"].wait(), timeout=SSE_KEEPALIVE_INTERVAL)
+        except asyncio.TimeoutError:
+            yield b":keepalive\n\n"
+
+@app.get("/events/{job_id}")
+async def job_events(job_id: str):
+    """
+    Server-Sent Events stream of a job's progress: a "status" event whenever its status
+    changes and a final "results" event once it finishes. Preferred over /ws/{job_id}.
+    """
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(404, "job not found")
+    return StreamingResponse(
+        _job_event_stream(job_id, job),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.websocket("/ws/{job_id}")
 async def ws_endpoint(websocket: WebSocket, job_id:str):
+    """
+    Deliver a job's final state over a WebSocket. Clients may ask for binary MessagePack
+    frames with ?protocol=msgpack (see backend.ws); the default is JSON text frames.
+    """
+    protocol = ws.negotiate_protocol(websocket.query_params.get("protocol", ws.JSON_PROTOCOL))
     await websocket.accept()
-    await websocket.send_json({"status":"connected","job_id":job_id})
-    # naive: send updates if job exists
-    import asyncio
-    while True:
-        if job_id in jobs and jobs[job_id]["status"]=="finished":
-            await websocket.send_json({"status":"finished","result":jobs[job_id].get("result")})
-            break
-        await asyncio.sleep(0.5)
-    await websocket.close()
\ No newline at end of file
+    await ws.send(websocket, {"status":"connected","job_id":job_id,"protocol":protocol}, protocol)
+    job = jobs.get(job_id)
+    if job is None:
+        await ws.send(websocket, {"status":"not_found","job_id":job_id}, protocol)
+        await websocket.close()
+        return
+    # the worker's {"type": "status" | "results"} broadcasts reach this client while it waits
+    await ws.register(job_id, websocket, protocol)
+    try:
+        # wake up once, when the worker signals a terminal state, instead of polling
+        try:
+            await asyncio.wait_for(job["done"].wait(), timeout=WS_JOB_WAIT_TIMEOUT)
+        except asyncio.TimeoutError:
+            await websocket.close()
+            return
+        if job["status"] == "finished":
+            await ws.send(websocket, {"status":"finished","result":job.get("result")}, protocol)
+        else:
+            await ws.send(websocket, {"status":job["status"],"error":job.get("error")}, protocol)
+        await websocket.close()
+    finally:
+        await ws.unregister(job_id, websocket)
@@ -1,11 +1,25 @@
 import logging
 import argparse
+import site
 import sys
 from pathlib import Path
 import uvicorn
 
 logger = logging.getLogger(__name__)
 
+def _warn_if_shadowed(app_file: Path) -> None:
+    """
+    Warn when backend.app was imported from somewhere other than an installed copy of the
+    package in site-packages, e.g. a working tree on sys.path (python -m from the repo)
+    shadowing the installed wheel, so the server is not running the code that was installed.
+    """
+    app_root = app_file.resolve().parent
+    for p in site.getsitepackages():
+        installed = Path(p) / "backend"
+        if (installed / "app.py").is_file() and installed.resolve() != app_root:
+            logger.warning(f"backend.app was imported from {app_root}, which shadows the installed package at {installed}; check sys.path and the working directory.")
+            return
+
 def main(argv=None):
     parser = argparse.ArgumentParser(prog="eqpp-server", description="Run Equation Phase Portrait Tool server")
     parser.add_argument("--host", default="127.0.0.1", help="Host to bind to")
@@ -30,8 +44,11 @@ def main(argv=None):
     # Import the FastAPI app object directly and run it. Passing the app object
     # avoids an extra import-by-name which can cause import ambiguity when the
     # same package exists both in the working tree and in site-packages.
+    import backend.app as _app_module
     from backend.app import app as _app
 
+    _warn_if_shadowed(Path(_app_module.__file__))
+
     # Run uvicorn programmatically so the console script starts the server
     uvicorn.run(_app, host=args.host, port=args.port, reload=args.reload)
 
@@ -1,9 +1,13 @@
 import sqlite3
 import json
+import threading
 from pathlib import Path
 from typing import Any, Dict, Optional, Tuple
 import logging
 
+from .db_writer import DBWriter
+from .responses import dumps
+
 # Use user directory for installed package, repo directory for development
 repo_root = Path(__file__).resolve().parent.parent
 if (repo_root / ".git").exists():
@@ -15,12 +19,41 @@ else:
 logger = logging.getLogger(__name__)
 
 
+# Pragmas applied once per connection: WAL lets readers proceed during writes and, with
+# synchronous=NORMAL, only fsyncs at checkpoints; the rest keep hot pages in memory.
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-64000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+)
+
+# sqlite3 connections may not be shared across threads, so each thread (event loop,
+# threadpool workers, background tasks) lazily opens one and keeps it for its lifetime.
+_local = threading.local()
+
+
 def _connect():
-    conn = sqlite3.connect(str(DB_PATH))
-    conn.row_factory = sqlite3.Row
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(str(DB_PATH))
+        conn.row_factory = sqlite3.Row
+        for pragma in _PRAGMAS:
+            conn.execute(pragma)
+        _local.conn = conn
     return conn
 
 
+# Job writes go through a single background writer that commits them in batches.
+_writer = DBWriter(_connect)
+
+
+def flush_writes(timeout: Optional[float] = None) -> None:
+    """Wait until all queued job writes have been committed."""
+    _writer.flush(timeout)
+
+
 def init_db():
     DB_PATH.parent.mkdir(parents=True, exist_ok=True)
     logger.info(f"Initializing DB at: {DB_PATH}")
@@ -38,48 +71,42 @@ def init_db():
     )
     """
     )
+    # supports queue-style scans such as "oldest job with status X"
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs(status, created_at)")
     conn.commit()
-    conn.close()
 
 
-def save_job_request(job_id: str, request: Dict[str, Any]):
+def save_job_request(job_id: str, request: Dict[str, Any], durable: bool = False):
     logger.info("Saving job request for %s", job_id)
-    conn = _connect()
-    cur = conn.cursor()
-    cur.execute(
-        "INSERT OR REPLACE INTO jobs (job_id, status, request_json) VALUES (?, ?, ?)",
+    _writer.submit(
+        # UPSERT updates the row in place; INSERT OR REPLACE would delete and re-insert it
+        "INSERT INTO jobs (job_id, status, request_json) VALUES (?, ?, ?) "
+        "ON CONFLICT(job_id) DO UPDATE SET status = excluded.status, request_json = excluded.request_json",
         (job_id, "queued", json.dumps(request)),
+        durable=durable,
     )
-    conn.commit()
-    conn.close()
-    logger.info("Saved job request for %s", job_id)
+    logger.info("Queued job request for %s", job_id)
 
 
-def update_job_status(job_id: str, status: str):
-    conn = _connect()
-    cur = conn.cursor()
-    cur.execute("UPDATE jobs SET status = ? WHERE job_id = ?", (status, job_id))
-    conn.commit()
-    conn.close()
+def update_job_status(job_id: str, status: str, durable: bool = False):
+    _writer.submit("UPDATE jobs SET status = ? WHERE job_id = ?", (status, job_id), durable=durable)
 
 
-def save_job_result(job_id: str, result: Dict[str, Any]):
-    conn = _connect()
-    cur = conn.cursor()
-    cur.execute(
+def save_job_result(job_id: str, result: Dict[str, Any], durable: bool = False):
+    _writer.submit(
         "UPDATE jobs SET result_json = ?, status = ?, finished_at = CURRENT_TIMESTAMP WHERE job_id = ?",
-        (json.dumps(result), "finished", job_id),
+        (dumps(result).decode("utf-8"), "finished", job_id),
+        durable=durable,
     )
-    conn.commit()
-    conn.close()
 
 
 def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    # read-your-writes: make sure queued writes for this job have landed
+    _writer.flush()
     conn = _connect()
     cur = conn.cursor()
     cur.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,))
     row = cur.fetchone()
-    conn.close()
     if not row:
         return None
     return {
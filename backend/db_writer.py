@@ -0,0 +1,133 @@
+"""
+Background SQLite writer.
+
+Single-row INSERT/UPDATE statements are queued and applied by one daemon thread, which
+commits up to `batch_max` of them per transaction. This amortizes the commit and the
+SQLite write lock over bursts of job submissions and keeps writes in submission order.
+
+Writes are fire-and-forget by default; `durable=True` blocks until the statement has been
+committed (and re-raises its error, if any). Pending writes are flushed at interpreter exit.
+
+The writer thread survives connection failures: the batch at hand fails (durable waiters get
+the error) and the connection is opened again for the next batch.
+"""
+import atexit
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+BATCH_MAX = 100
+BATCH_WAIT = 0.01  # seconds to keep collecting statements after the first one arrives
+DURABLE_TIMEOUT = 30.0  # seconds a durable submit waits for its commit
+
+
+class _Write:
+    __slots__ = ("sql", "params", "done", "error")
+
+    def __init__(self, sql: Optional[str], params: Sequence[Any], wait: bool) -> None:
+        self.sql = sql
+        self.params = params
+        self.done = threading.Event() if wait else None
+        self.error: Optional[BaseException] = None
+
+
+class DBWriter:
+    def __init__(
+        self,
+        connect: Callable[[], sqlite3.Connection],
+        batch_max: int = BATCH_MAX,
+        batch_wait: float = BATCH_WAIT,
+    ) -> None:
+        self._connect = connect
+        self._batch_max = batch_max
+        self._batch_wait = batch_wait
+        self._queue: "queue.Queue[_Write]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def submit(
+        self, sql: str, params: Sequence[Any] = (), durable: bool = False, timeout: float = DURABLE_TIMEOUT
+    ) -> None:
+        self._ensure_started()
+        item = _Write(sql, params, durable)
+        self._queue.put(item)
+        if durable:
+            if not item.done.wait(timeout):
+                raise TimeoutError(f"DB write not committed within {timeout}s: {sql}")
+            if item.error is not None:
+                raise item.error
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Block until every write submitted before this call has been committed."""
+        if self._thread is None:
+            return
+        marker = _Write(None, (), True)
+        self._queue.put(marker)
+        marker.done.wait(timeout)
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+                thread.start()
+                self._thread = thread
+                atexit.register(self.flush, 5.0)
+
+    def _drain(self) -> List[_Write]:
+        items = [self._queue.get()]
+        deadline = time.monotonic() + self._batch_wait
+        # stop collecting early when someone is blocked waiting on this batch
+        while len(items) < self._batch_max and items[-1].done is None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                items.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return items
+
+    def _run(self) -> None:
+        conn: Optional[sqlite3.Connection] = None
+        while True:
+            items = self._drain()
+            writes = [w for w in items if w.sql is not None]
+            try:
+                if writes and conn is None:
+                    conn = self._connect()
+                if writes:
+                    self._apply(conn, writes)
+            except Exception as exc:
+                # no usable connection: fail this batch and reconnect for the next one
+                logger.exception("DB writer could not apply %d statements", len(writes))
+                for w in writes:
+                    w.error = exc
+                conn = None
+            finally:
+                for w in items:
+                    if w.done is not None:
+                        w.done.set()
+
+    @staticmethod
+    def _apply(conn: sqlite3.Connection, writes: List[_Write]) -> None:
+        try:
+            with conn:
+                for w in writes:
+                    conn.execute(w.sql, w.params)
+        except Exception:
+            logger.exception("Batched DB write failed; retrying %d statements individually", len(writes))
+            # one bad statement must not drop the rest of the batch
+            for w in writes:
+                try:
+                    with conn:
+                        conn.execute(w.sql, w.params)
+                except Exception as exc:
+                    w.error = exc
+                    logger.exception("DB write failed: %s", w.sql)
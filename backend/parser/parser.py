@@ -14,9 +14,24 @@ Improvements over MVP:
 """
 import re
 import ast
-from typing import List, Callable, Dict, Tuple
+from functools import lru_cache
+from typing import List, Callable, Dict, Optional, Tuple
 import numpy as np
 
+try:
+    import numba as _numba
+
+    NUMBA_AVAILABLE = True
+    # numbalsoda's lsoda_sig: void(double t, double* u, double* du, double* p)
+    LSODA_SIG = _numba.types.void(
+        _numba.types.double,
+        _numba.types.CPointer(_numba.types.double),
+        _numba.types.CPointer(_numba.types.double),
+        _numba.types.CPointer(_numba.types.double),
+    )
+except Exception:
+    NUMBA_AVAILABLE = False
+
 # map Mathematica-like function names to numpy
 FN_REPL = {
     "Sin": "np.sin",
@@ -30,10 +45,50 @@ FN_REPL = {
 }
 
 
+# All patterns are compiled once at import; parsing runs them on every request.
+# Mathematica function names, matched as whole words in a single pass
+_FN_RE = re.compile(r"\b(" + "|".join(re.escape(m) for m in FN_REPL) + r")\b")
+# variable access like x[t] or x(t)
+_VAR_ACCESS_RE = re.compile(r"([A-Za-z_]\w*)\s*(?:\[\s*t\s*\]|\(\s*t\s*\))")
+# derivative forms: x'[t], x'(t) or D[x[t], t]
+_VAR_DERIV_SIMPLE_RE = re.compile(r"([A-Za-z_]\w*)\s*'\s*(?:\[\s*t\s*\]|\(\s*t\s*\))")
+_D_RE = re.compile(r"D\s*\(\s*([A-Za-z_]\w*(?:\s*\[\s*t\s*\]|\s*\(\s*t\s*\)))\s*,\s*t\s*\)")
+_D_VAR_RE = re.compile(r"([A-Za-z_]\w*)\s*(?:\[\s*t\s*\]|\(\s*t\s*\))")
+# bare identifiers; attribute names (the "sin" in "np.sin") are not tokens of their own
+_TOKEN_RE = re.compile(r"(?<!\.)\b([A-Za-z_]\w*)\b")
+# state accesses emitted by _translate_rhs
+_Y_INDEX_RE = re.compile(r"\by\[(\d+)\]")
+
+# The only builtin generated code may reference ("len" passes through token translation);
+# everything else is unavailable to the compiled RHS.
+_SAFE_BUILTINS = {"len": len}
+
+# parameter references emitted by MathematicaParser._translate_rhs
+PARAM_GET_RE = re.compile(r"params\.get\('([A-Za-z_]\w*)', 0\.0\)")
+
+
 class ParseError(ValueError):
     pass
 
 
+def _stack_components(parts, y) -> np.ndarray:
+    """
+    Stack translated RHS components into a float array of shape (ndim,) + grid shape.
+
+    When `y` is a single state vector every component is a scalar and this is a plain
+    `np.array`. When `y` is a batch of states shaped (ndim, N) each component is broadcast
+    to the batch shape, so constant or parameter-only components (e.g. "x'[t] == 1") still
+    yield one value per state even when no component depends on `y`.
+    """
+    batch_shape = np.shape(y)[1:]
+    if not batch_shape:
+        return np.array(parts, dtype=float)
+    out = np.empty((len(parts),) + batch_shape, dtype=float)
+    for row, part in zip(out, parts):
+        row[...] = part
+    return out
+
+
 def split_top_level(s: str, sep: str = ",") -> List[str]:
     """
     Split string `s` on separator `sep` but only at top-level (not inside parentheses/brackets/braces).
@@ -67,20 +122,21 @@ def split_top_level(s: str, sep: str = ",") -> List[str]:
 
 
 class MathematicaParser:
+    """
+    Stateless after construction (the patterns are shared module-level regexes), so one
+    instance can serve any number of threads; the module helpers below use `_PARSER`.
+    """
+
     def __init__(self) -> None:
-        # variable access like x[t] or x(t)
-        self.var_access_re = re.compile(r"([A-Za-z_]\w*)\s*(?:\[\s*t\s*\]|\(\s*t\s*\))")
-        # derivative forms: x'[t], x'(t) or D[x[t], t]
-        self.var_deriv_simple_re = re.compile(r"([A-Za-z_]\w*)\s*'\s*(?:\[\s*t\s*\]|\(\s*t\s*\))")
-        self.D_pattern = re.compile(r"D\s*\(\s*([A-Za-z_]\w*(?:\s*\[\s*t\s*\]|\s*\(\s*t\s*\)))\s*,\s*t\s*\)")
+        self.var_access_re = _VAR_ACCESS_RE
+        self.var_deriv_simple_re = _VAR_DERIV_SIMPLE_RE
+        self.D_pattern = _D_RE
 
     def _normalize_functions_and_operators(self, s: str) -> str:
         # caret operator to python **
         s = s.replace("^", "**")
         # replace Mathematica function names with numpy equivalents (word boundaries)
-        for m, r in FN_REPL.items():
-            s = re.sub(r"\b" + re.escape(m) + r"\b", r, s)
-        return s
+        return _FN_RE.sub(lambda m: FN_REPL[m.group(1)], s)
 
     def _identify_state_vars(self, lhs: str) -> List[str]:
         """
@@ -105,7 +161,7 @@ class MathematicaParser:
             if mD:
                 inner = mD.group(1)
                 # extract variable name, which may be x[t] or x(t)
-                mvar = re.match(r"([A-Za-z_]\w*)\s*(?:\[\s*t\s*\]|\(\s*t\s*\))", inner.strip())
+                mvar = _D_VAR_RE.match(inner.strip())
                 if mvar:
                     v = mvar.group(1)
                     if v not in vars_found:
@@ -150,7 +206,7 @@ class MathematicaParser:
         # replace D[...] occurrences to the inner expression (we don't evaluate D symbolically)
         # e.g., D[x[t],t] -> treat as derivative reference to state variable -> translate to something invalid
         # Here we treat D[x[t],t] same as x[t] for RHS translation (user should put derivative on LHS).
-        expr = re.sub(r"D\s*\(\s*([A-Za-z_]\w*(?:\s*\[\s*t\s*\]|\s*\(\s*t\s*\)))\s*,\s*t\s*\)", r"\1", expr)
+        expr = _D_RE.sub(r"\1", expr)
 
         # replace variable accesses x[t] and x(t) with y[idx]
         def var_access_sub(m):
@@ -165,7 +221,6 @@ class MathematicaParser:
         expr = self.var_access_re.sub(var_access_sub, expr)
 
         # token replacement for bare identifiers
-        token_re = re.compile(r"\b([A-Za-z_]\w*)\b")
         def token_sub(m):
             tok = m.group(1)
             # safe keywords or numpy namespace
@@ -180,7 +235,7 @@ class MathematicaParser:
             # otherwise treat as parameter
             return f"params.get('{tok}', 0.0)"
 
-        expr = token_re.sub(token_sub, expr)
+        expr = _TOKEN_RE.sub(token_sub, expr)
 
         # sanity checks
         if "__" in expr or "import" in expr or "exec" in expr or "open(" in expr:
@@ -193,16 +248,10 @@ class MathematicaParser:
             raise ParseError(f"Failed to parse expression after translation: {e}\nOriginal: {original}\nTranslated: {expr}")
         return expr
 
-    def parse(self, equations: str) -> Tuple[Callable[[float, np.ndarray, Dict[str, float]], np.ndarray], List[str]]:
+    def _translate_equations(self, equations: str) -> Tuple[List[str], List[str]]:
         """
-        Parse a Mathematica-like equation string and return a callable f(t, y, params)
-        and the ordered list of state variable names.
-
-        Examples accepted:
-         - "x'[t] == -x[t] + y[t]^2"
-         - "{x'[t], y'[t]} == {x[t] - y[t], x[t]*y[t]}"
-         - "x'(t) == Sin(x(t))"
-         - "D[x[t], t] == x[t] - y[t]"
+        Split an equation string into LHS/RHS and translate each RHS component.
+        Returns (translated RHS expressions, ordered state variable names).
         """
         if "==" not in equations:
             raise ParseError("Equation string must contain '==' separating LHS and RHS.")
@@ -239,21 +288,193 @@ class MathematicaParser:
 
         # translate each rhs expression
         translated = [self._translate_rhs(expr, state_vars) for expr in rhs_items]
+        return translated, state_vars
+
+    @staticmethod
+    def _bake_params(expr: str, params: Dict[str, float]) -> str:
+        """Replace params.get('k', 0.0) lookups with the numeric value of params['k']."""
+
+        def param_sub(m):
+            name = m.group(1)
+            if name not in params:
+                return m.group(0)
+            try:
+                value = float(params[name])
+            except (TypeError, ValueError):
+                return m.group(0)
+            if not np.isfinite(value):
+                # repr would give a bare 'inf'/'nan' name; keep the lookup instead
+                return m.group(0)
+            # parenthesized so negative values keep their precedence, e.g. k^2
+            return f"({value!r})"
+
+        return PARAM_GET_RE.sub(param_sub, expr)
+
+    def parse(
+        self, equations: str, params: Optional[Dict[str, float]] = None
+    ) -> Tuple[Callable[[float, np.ndarray, Dict[str, float]], np.ndarray], List[str]]:
+        """
+        Parse a Mathematica-like equation string and return a callable f(t, y, params)
+        and the ordered list of state variable names.
+
+        `y` may be a single state vector (ndim,) or a batch of states (ndim, N); the
+        result has the same trailing shape, i.e. (ndim,) or (ndim, N).
+
+        If `params` is given, those parameter values are baked into the generated code as
+        constants (no dict lookups per evaluation); the callable then ignores the values
+        passed for them at call time. Parameters not in `params` are still looked up.
+
+        Examples accepted:
+         - "x'[t] == -x[t] + y[t]^2"
+         - "{x'[t], y'[t]} == {x[t] - y[t], x[t]*y[t]}"
+         - "x'(t) == Sin(x(t))"
+         - "D[x[t], t] == x[t] - y[t]"
+        """
+        translated, state_vars = self._translate_equations(equations)
+        if params:
+            translated = [self._bake_params(expr, params) for expr in translated]
 
-        # build a function body that evaluates a numpy array
-        vec_body = "np.array([" + ",".join(translated) + "], dtype=float)"
+        # build a function body that evaluates a numpy array; components broadcast when
+        # y is a batch of states shaped (ndim, N), so one call can evaluate a whole grid
+        vec_body = "_stack_components([" + ",".join(translated) + "], y)"
 
         # compile into a python function safely
         def make_callable(body_src: str) -> Callable:
+            # np is bound in the function globals, so there is no import to run per call
             src = "def _f(t, y, params):\n"
-            src += "    import numpy as np\n"
             src += "    return " + body_src + "\n"
             module = {}
+            namespace = {"np": np, "_stack_components": _stack_components, "__builtins__": _SAFE_BUILTINS}
             try:
-                exec(src, {"np": np}, module)
+                exec(compile(src, "<eqpp-rhs>", "exec"), namespace, module)
             except Exception as e:
                 raise ParseError(f"Failed to compile solver function: {e}\nSource:\n{src}")
             return module["_f"]
 
         f_callable = make_callable(vec_body)
-        return f_callable, state_vars
\ No newline at end of file
+        return f_callable, state_vars
+
+    def parse_numba(
+        self, equations: str, lanes: bool = False
+    ) -> Tuple[Callable[..., np.ndarray], List[str], List[str]]:
+        """
+        Like `parse`, but return a numba-jitted kernel f(t, y, p) for a single state vector.
+
+        Numba cannot take the params dict, so parameters are read from a packed float array
+        `p` ordered as the returned parameter names (see `pack_params`). Unknown parameters
+        therefore keep the 0.0 default of the dict path. Returns (kernel, state_vars, param_names).
+        The kernel is compiled lazily by numba on its first call.
+
+        With lanes=True the kernel is f(t, y, p, out) instead: y and out are (ndim, W) slabs
+        holding W independent states, one per column, and every component is evaluated in a
+        loop over the lanes that LLVM can vectorize (see NumbaRunner.solve_batch_simd).
+        """
+        if not NUMBA_AVAILABLE:
+            raise RuntimeError("numba is not installed; use MathematicaParser.parse instead.")
+        translated, state_vars = self._translate_equations(equations)
+        exprs, param_names = self._packed_param_exprs(translated)
+
+        if lanes:
+            src = "def _f_nb(t, y, p, out):\n"
+            src += "    for l in range(y.shape[1]):\n"
+            for idx, expr in enumerate(exprs):
+                src += f"        out[{idx}, l] = " + _Y_INDEX_RE.sub(r"y[\1, l]", expr) + "\n"
+        else:
+            src = "def _f_nb(t, y, p):\n"
+            src += f"    out = np.empty({len(exprs)})\n"
+            for idx, expr in enumerate(exprs):
+                src += f"    out[{idx}] = " + expr + "\n"
+        src += "    return out\n"
+        module = {}
+        try:
+            exec(compile(src, "<eqpp-rhs-numba>", "exec"), {"np": np}, module)
+            kernel = _numba.njit(module["_f_nb"])
+            # lets solvers pack a params dict into `p` without knowing the equation
+            kernel.param_names = tuple(param_names)
+            kernel.lanes = lanes
+        except Exception as e:
+            raise ParseError(f"Failed to compile numba solver function: {e}\nSource:\n{src}")
+        return kernel, state_vars, param_names
+
+    def parse_lsoda(self, equations: str) -> Tuple[Callable[..., None], List[str], List[str]]:
+        """
+        Compile the RHS to a numba cfunc with numbalsoda's `lsoda_sig`,
+        rhs(t, u, du, p) on raw double pointers, so numbalsoda.lsoda / dop853 can integrate
+        without calling back into Python. Parameters are packed as for `parse_numba`.
+        Returns (cfunc, state_vars, param_names); pass `cfunc.address` to numbalsoda.
+        """
+        if not NUMBA_AVAILABLE:
+            raise RuntimeError("numba is not installed; use MathematicaParser.parse instead.")
+        translated, state_vars = self._translate_equations(equations)
+        exprs, param_names = self._packed_param_exprs(translated)
+
+        src = "def _f_lsoda(t, u, du_ptr, p_ptr):\n"
+        src += f"    y = carray(u, ({len(exprs)},))\n"
+        src += f"    du = carray(du_ptr, ({len(exprs)},))\n"
+        src += f"    p = carray(p_ptr, ({len(param_names)},))\n"
+        for idx, expr in enumerate(exprs):
+            src += f"    du[{idx}] = " + expr + "\n"
+        module = {}
+        try:
+            exec(compile(src, "<eqpp-rhs-lsoda>", "exec"), {"np": np, "carray": _numba.carray}, module)
+            rhs = _numba.cfunc(LSODA_SIG)(module["_f_lsoda"])
+            rhs.param_names = tuple(param_names)
+        except Exception as e:
+            raise ParseError(f"Failed to compile LSODA solver function: {e}\nSource:\n{src}")
+        return rhs, state_vars, param_names
+
+    @staticmethod
+    def _packed_param_exprs(translated: List[str]) -> Tuple[List[str], List[str]]:
+        """Rewrite params.get('k', 0.0) references to p[idx]; returns (exprs, param_names)."""
+        param_names: List[str] = []
+
+        def param_sub(m):
+            name = m.group(1)
+            if name not in param_names:
+                param_names.append(name)
+            return f"p[{param_names.index(name)}]"
+
+        return [PARAM_GET_RE.sub(param_sub, expr) for expr in translated], param_names
+
+
+# shared instance for the cached helpers; parse* methods keep no per-call state on self
+_PARSER = MathematicaParser()
+
+
+def pack_params(param_names: List[str], params: Dict[str, float]) -> np.ndarray:
+    """Pack a params dict into the float array expected by `parse_numba` kernels."""
+    return np.array([float(params.get(name, 0.0)) for name in param_names], dtype=float)
+
+
+def parse_cached(
+    equations: str, params: Optional[Dict[str, float]] = None
+) -> Tuple[Callable[[float, np.ndarray, Dict[str, float]], np.ndarray], List[str]]:
+    """
+    Memoized `MathematicaParser().parse(equations, params)` keyed on the raw equation string
+    and, when given, the parameter values baked into the callable.
+
+    The compiled callable only closes over numpy, so it is safe to share between requests.
+    The returned state variable list is shared as well and must not be mutated.
+    """
+    params_key = tuple(sorted((k, float(v)) for k, v in params.items())) if params else None
+    return _parse_cached(equations, params_key)
+
+
+@lru_cache(maxsize=256)
+def _parse_cached(equations: str, params_key: Optional[Tuple[Tuple[str, float], ...]]):
+    return _PARSER.parse(equations, params=dict(params_key) if params_key else None)
+
+
+@lru_cache(maxsize=256)
+def parse_numba_cached(equations: str, lanes: bool = False) -> Tuple[Callable[..., np.ndarray], List[str], List[str]]:
+    """
+    Memoized `MathematicaParser().parse_numba(equations, lanes)`; reusing the dispatcher also
+    reuses numba's compiled machine code, which is the expensive part.
+    """
+    return _PARSER.parse_numba(equations, lanes=lanes)
+
+
+@lru_cache(maxsize=256)
+def parse_lsoda_cached(equations: str) -> Tuple[Callable[..., None], List[str], List[str]]:
+    """Memoized `MathematicaParser().parse_lsoda(equations)` (the cfunc is compiled eagerly)."""
+    return _PARSER.parse_lsoda(equations)
@@ -0,0 +1,49 @@
+import json
+from typing import Any
+
+import numpy as np
+from starlette.responses import JSONResponse
+
+try:
+    import orjson as _orjson
+
+    ORJSON_AVAILABLE = True
+except Exception:
+    ORJSON_AVAILABLE = False
+
+
+def _to_builtin(content: Any) -> Any:
+    # stdlib json cannot serialize ndarrays; convert them (recursively) to lists
+    if isinstance(content, (np.ndarray, np.floating)) and content.dtype.kind == "f" and content.dtype.itemsize < 8:
+        # tolist() widens float32 to float64 and json prints its repr (0.10000000149011612);
+        # go through the shortest float32 text instead, as orjson writes it (0.1)
+        return np.asarray(content).astype(str).astype(np.float64).tolist()
+    if isinstance(content, np.ndarray):
+        return content.tolist()
+    if isinstance(content, dict):
+        return {k: _to_builtin(v) for k, v in content.items()}
+    if isinstance(content, (list, tuple)):
+        return [_to_builtin(v) for v in content]
+    return content
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize content to compact JSON bytes, with orjson when available."""
+    if ORJSON_AVAILABLE:
+        return _orjson.dumps(content, option=_orjson.OPT_SERIALIZE_NUMPY | _orjson.OPT_NON_STR_KEYS)
+    return json.dumps(_to_builtin(content), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson when it is installed (optional dependency).
+
+    orjson serializes numpy arrays natively, so endpoints may put ndarrays straight into
+    the content instead of calling tolist() first. Without orjson this falls back to the
+    stdlib encoder after converting arrays to lists.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if ORJSON_AVAILABLE:
+            return dumps(content)
+        return super().render(_to_builtin(content))
@@ -74,11 +74,52 @@ class AbstractSolver:
         events: Optional[List[Callable[[float, np.ndarray], float]]] = None,
     ) -> Tuple[np.ndarray, np.ndarray]:
         """
-        Optional: vectorized batch solve for many initial conditions in y0_batch
-        (shape: n_ic, ndim). Default implementation runs `solve` serially and
-        stacks results. Implementations optimized for batch execution should
-        override this method.
+        Batch solve for many initial conditions in y0_batch (shape: n_ic, ndim).
+
+        When `func` broadcasts over a batch of states shaped (ndim, n_ic) (parser-generated
+        callables do), all ICs are integrated as one flattened system with a single `solve`
+        call. Otherwise, or when events are requested, `solve` runs once per IC.
+        Note that for adaptive solvers the joint step size is shared by all trajectories.
+
+        Returns:
+            times: ndarray of shape (nt,)
+            trajectories: ndarray of shape (n_ic, nt, ndim)
         """
+        y0_batch = np.asarray(y0_batch, dtype=float)
+        params = params or {}
+        n_ic = y0_batch.shape[0]
+        batched = None
+        if n_ic > 1 and not events:
+            batched = self._batched_rhs(func, float(t_span[0]), y0_batch, params)
+        if batched is None:
+            return self._solve_batch_serial(func, t_span, y0_batch, params=params, t_eval=t_eval, events=events)
+
+        return self._solve_joint(batched, t_span, y0_batch, params, t_eval)
+
+    def _solve_joint(
+        self,
+        batched: Callable[[float, np.ndarray, Dict[str, float]], np.ndarray],
+        t_span: Tuple[float, float],
+        y0_batch: np.ndarray,
+        params: Dict[str, float],
+        t_eval: Optional[np.ndarray],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Integrate all ICs as one flattened system with the joint RHS `batched`."""
+        n_ic, ndim = y0_batch.shape
+        # state is packed as (ndim, n_ic) so each RHS component is one contiguous row
+        times, flat = self.solve(batched, t_span, y0_batch.T.reshape(-1), params=params, t_eval=t_eval)
+        trajectories = np.ascontiguousarray(flat.reshape(-1, ndim, n_ic).transpose(2, 0, 1))
+        return times, trajectories
+
+    def _solve_batch_serial(
+        self,
+        func: Callable[[float, np.ndarray, Dict[str, float]], np.ndarray],
+        t_span: Tuple[float, float],
+        y0_batch: np.ndarray,
+        params: Optional[Dict[str, float]] = None,
+        t_eval: Optional[np.ndarray] = None,
+        events: Optional[List[Callable[[float, np.ndarray], float]]] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
         results = []
         times = None
         for idx in range(y0_batch.shape[0]):
@@ -86,7 +127,49 @@ class AbstractSolver:
             if times is None:
                 times = t
             results.append(traj)
-        return times, np.stack(results, axis=1)  # shape (nt, n_ic, ndim)
+        return times, np.stack(results, axis=0)  # shape (n_ic, nt, ndim)
+
+    @staticmethod
+    def _batched_rhs(
+        func: Callable[[float, np.ndarray, Dict[str, float]], np.ndarray],
+        t0: float,
+        y0_batch: np.ndarray,
+        params: Dict[str, float],
+    ) -> Optional[Callable[[float, np.ndarray, Dict[str, float]], np.ndarray]]:
+        """
+        Return a flattened-state wrapper around `func` if it evaluates a (ndim, n_ic) batch
+        correctly, checked once against a single-state call; otherwise None.
+        """
+        n_ic, ndim = y0_batch.shape
+        try:
+            probe = np.asarray(func(t0, np.ascontiguousarray(y0_batch.T), params), dtype=float)
+            single = np.asarray(func(t0, y0_batch[0], params), dtype=float)
+        except Exception:
+            return None
+        if probe.shape != (ndim, n_ic) or not np.allclose(probe[:, 0], single, equal_nan=True):
+            return None
+
+        def f_batch(t, y_flat, p):
+            return np.asarray(func(t, y_flat.reshape(ndim, n_ic), p), dtype=float).reshape(-1)
+
+        return f_batch
+
+    @staticmethod
+    def _looped_rhs(
+        func: Callable[[float, np.ndarray, Dict[str, float]], np.ndarray],
+        n_ic: int,
+        ndim: int,
+    ) -> Callable[[float, np.ndarray, Dict[str, float]], np.ndarray]:
+        """Joint RHS over a flattened (ndim, n_ic) state for a `func` that only takes one state."""
+
+        def f_batch(t, y_flat, p):
+            y = y_flat.reshape(ndim, n_ic)
+            out = np.empty((ndim, n_ic), dtype=float)
+            for i in range(n_ic):
+                out[:, i] = func(t, y[:, i], p)
+            return out.reshape(-1)
+
+        return f_batch
 
 
 class SolverError(RuntimeError):
@@ -1,6 +1,14 @@
 from typing import Any, Callable, Dict, List, Optional, Tuple
 import numpy as np
 from scipy.integrate import solve_ivp
+
+try:
+    import numbalsoda as _numbalsoda
+
+    NUMBALSODA_AVAILABLE = True
+except Exception:
+    NUMBALSODA_AVAILABLE = False
+
 try:
     # normal package-relative import (works when running as a package)
     try:
@@ -37,13 +45,37 @@ except Exception:
     SolverError = _module.SolverError
 
 
+def _is_lsoda_rhs(func) -> bool:
+    """True for a numba cfunc with an entry point address (see MathematicaParser.parse_lsoda)."""
+    return isinstance(getattr(func, "address", None), int) and hasattr(func, "ctypes")
+
+
+def _lsoda_data(func, params) -> np.ndarray:
+    # parameters packed in the order recorded on the cfunc; numbalsoda needs a non-empty buffer
+    if isinstance(params, np.ndarray):
+        data = np.ascontiguousarray(params, dtype=float)
+    else:
+        names = getattr(func, "param_names", None)
+        if names is None:
+            names = list(params)
+        data = np.array([float(params.get(name, 0.0)) for name in names], dtype=float)
+    return data if data.size else np.zeros(1)
+
+
 class ScipySolver(AbstractSolver):
     """
     Adapter using scipy.integrate.solve_ivp.
 
     - func: callable f(t, y, params) -> ndarray
     - Supports events (callables g(t, y) -> float) but without direction/terminal metadata.
-    - Vectorized batch solves use the default AbstractSolver.solve_batch (serial).
+      solve_ivp evaluates events per step, so `vectorized` event functions are still called
+      with a single (t, y) here.
+    - solve_batch integrates each IC separately so every trajectory keeps its own
+      adaptive step size and error control. With options.extras["joint_batch"] set it
+      uses solve_batch_joint instead.
+    - If `func` is a numba cfunc with numbalsoda's `lsoda_sig` (MathematicaParser.parse_lsoda)
+      and numbalsoda is installed, the solve runs in compiled code via numbalsoda.lsoda
+      (or dop853 for method "DOP853") instead of solve_ivp. Events are not supported there.
     """
 
     def __init__(self, options: Optional[IntegratorOptions] = None) -> None:
@@ -58,18 +90,48 @@ class ScipySolver(AbstractSolver):
         t_eval: Optional[np.ndarray] = None,
         events: Optional[List[Callable[[float, np.ndarray], float]]] = None,
     ) -> Tuple[np.ndarray, np.ndarray]:
+        times, traj = self._integrate(func, t_span, y0, params, t_eval, events)
+        # sol.y.T is a strided view; hand out a C-ordered (nt, ndim) array so later
+        # row-wise reads (tolist(), serialization) walk memory sequentially
+        return times, np.ascontiguousarray(traj)
+
+    def _integrate(
+        self,
+        func: Callable[[float, np.ndarray, Dict[str, float]], np.ndarray],
+        t_span: Tuple[float, float],
+        y0: np.ndarray,
+        params: Optional[Dict[str, float]],
+        t_eval: Optional[np.ndarray],
+        events: Optional[List[Callable[[float, np.ndarray], float]]],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Like `solve`, but the (nt, ndim) trajectory may be a non-contiguous view."""
         params = params or {}
+        if _is_lsoda_rhs(func):
+            if not NUMBALSODA_AVAILABLE:
+                raise SolverError(
+                    "numbalsoda is not installed; cannot integrate a cfunc right-hand side.",
+                    details={"backend": "numbalsoda"},
+                )
+            if events:
+                raise SolverError(
+                    "Events are not supported with numbalsoda; use a Python right-hand side.",
+                    details={"backend": "numbalsoda"},
+                )
+            return self._solve_lsoda(func, t_span, y0, params, t_eval)
 
-        # wrap user's func to a signature compatible with solve_ivp: (t, y) -> dy/dt
+        # wrap user's func to a signature compatible with solve_ivp: (t, y) -> dy/dt.
+        # y0 is converted to float64 below, and solve_ivp then always passes y as a float64
+        # ndarray, so no per-call conversion is needed
         def f_wrapped(t, y):
-            return func(float(t), np.asarray(y, dtype=float), params)
+            return func(t, y, params)
 
         # prepare events for solve_ivp if any
         ivp_events = None
         if events:
             def make_event(g):
+                # solve_ivp already passes y as a float64 array
                 def ev(t, y):
-                    return float(g(float(t), np.asarray(y, dtype=float)))
+                    return float(g(t, y))
                 ev.terminal = False
                 ev.direction = 0.0
                 return ev
@@ -126,10 +188,36 @@ class ScipySolver(AbstractSolver):
                 trajectory=trajectory,
             )
 
-        # sol.y has shape (ndim, nt) -> transpose to (nt, ndim)
-        times = sol.t
-        traj = sol.y.T
-        return times, traj
+        # sol.y has shape (ndim, nt) -> transposed view (nt, ndim)
+        return sol.t, sol.y.T
+
+    def _solve_lsoda(self, func, t_span, y0, params, t_eval) -> Tuple[np.ndarray, np.ndarray]:
+        t0, tf = float(t_span[0]), float(t_span[1])
+        t_eval = np.linspace(t0, tf, 201) if t_eval is None else np.asarray(t_eval, dtype=float)
+        u0 = np.ascontiguousarray(y0, dtype=float)
+        data = _lsoda_data(func, params)
+        # numbalsoda applies y0 at the first output time; when t_eval starts after t0, prepend
+        # t0 (and drop its row) so the initial condition holds at t0 as with solve_ivp
+        skip = int(t_eval.size == 0 or t_eval[0] != t0)
+        t_out = np.concatenate(([t0], t_eval)) if skip else t_eval
+        integrate = _numbalsoda.dop853 if getattr(self.options, "method", "") == "DOP853" else _numbalsoda.lsoda
+        usol, success = integrate(
+            func.address,
+            u0,
+            t_out,
+            data=data,
+            rtol=getattr(self.options, "rtol", 1e-6),
+            atol=getattr(self.options, "atol", 1e-9),
+        )
+        usol = usol[skip:]
+        if not success:
+            raise SolverError(
+                self._format_failure_message("numbalsoda reported an unsuccessful integration", None),
+                details={"solver_message": "numbalsoda success=False", "backend": "numbalsoda"},
+                times=t_eval,
+                trajectory=usol,
+            )
+        return t_eval, usol
 
     @staticmethod
     def _format_failure_message(message: str, sol: Optional[Any]) -> str:
@@ -157,7 +245,6 @@ class ScipySolver(AbstractSolver):
 
         return base + detail
 
-    # Optional: override batch to run in parallel (simple multiprocessing map could be added later)
     def solve_batch(
         self,
         func: Callable[[float, np.ndarray, Dict[str, float]], np.ndarray],
@@ -167,15 +254,44 @@ class ScipySolver(AbstractSolver):
         t_eval: Optional[np.ndarray] = None,
         events: Optional[List[Callable[[float, np.ndarray], float]]] = None,
     ):
+        if self.options.extras.get("joint_batch") and not events:
+            return self.solve_batch_joint(func, t_span, y0_batch, params=params, t_eval=t_eval)
         n_ic = int(y0_batch.shape[0])
-        results = []
         times = None
+        out = None
         for i in range(n_ic):
-            t, traj = self.solve(func, t_span, y0_batch[i], params=params, t_eval=t_eval, events=events)
-            if times is None:
+            t, traj = self._integrate(func, t_span, y0_batch[i], params, t_eval, events)
+            if out is None:
                 times = t
-            results.append(traj)
-        # results: list of (nt, ndim) -> stack into (n_ic, nt, ndim)
-        stacked = np.stack(results, axis=0)
+                out = np.empty((n_ic,) + traj.shape, dtype=float)
+            # the only copy of each trajectory: straight from SciPy's (ndim, nt) buffer
+            # into the C-ordered (n_ic, nt, ndim) result
+            out[i] = traj
         # return times (nt,) and trajectories (n_ic, nt, ndim)
-        return times, stacked
\ No newline at end of file
+        return times, out
+
+    def solve_batch_joint(
+        self,
+        func: Callable[[float, np.ndarray, Dict[str, float]], np.ndarray],
+        t_span: Tuple[float, float],
+        y0_batch: np.ndarray,
+        params: Optional[Dict[str, float]] = None,
+        t_eval: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Integrate all ICs as one augmented system with a single solve_ivp call, which pays
+        the Python/SciPy call overhead and step-controller start-up once instead of per IC.
+
+        The RHS is evaluated on the whole (ndim, n_ic) batch at once when it broadcasts
+        (parser-generated callables do), otherwise IC by IC. The step size is shared, so it
+        is set by the fastest-varying / stiffest trajectory: results can differ from
+        solve_batch within the tolerances, and mixing stiff and smooth ICs can be slower
+        than solving them separately. Returns (times, trajectories (n_ic, nt, ndim)).
+        """
+        y0_batch = np.asarray(y0_batch, dtype=float)
+        params = params or {}
+        n_ic, ndim = y0_batch.shape
+        batched = self._batched_rhs(func, float(t_span[0]), y0_batch, params)
+        if batched is None:
+            batched = self._looped_rhs(func, n_ic, ndim)
+        return self._solve_joint(batched, t_span, y0_batch, params, t_eval)
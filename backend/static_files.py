@@ -0,0 +1,60 @@
+import os
+from pathlib import Path
+from typing import Union
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+# Vite emits content-hashed file names under assets/, so those can be cached forever.
+# Everything else (index.html, favicon, ...) must be revalidated so new builds are picked up.
+IMMUTABLE_DIR = "assets"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+
+def _opaque_tag(tag: str) -> str:
+    # W/"abc" -> "abc"; no str.removeprefix, which needs Python 3.9
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+class CachedStaticFiles(StaticFiles):
+    """
+    StaticFiles with a cheap ETag ("<size>-<mtime_ns>" in hex, no hashing) and
+    Cache-Control headers suited to a hash-named SPA bundle. Conditional requests with a
+    matching If-None-Match are answered with 304.
+
+    The ETag is weak: GZipMiddleware may re-encode the body, so the bytes on the wire are
+    not guaranteed to be identical for a given tag.
+    """
+
+    def file_response(
+        self,
+        full_path: Union[str, "os.PathLike[str]"],
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        headers = {
+            "etag": f'W/"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"',
+            "cache-control": self._cache_control(full_path),
+        }
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result, headers=headers)
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
+
+    def is_not_modified(self, response_headers: Headers, request_headers: Headers) -> bool:
+        # weak comparison (RFC 9110 13.1.2): the base class only strips W/ from the request side
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match and if_none_match.strip() != "*":
+            etag = _opaque_tag(response_headers["etag"])
+            return etag in [_opaque_tag(tag.strip()) for tag in if_none_match.split(",")]
+        return super().is_not_modified(response_headers, request_headers)
+
+    @staticmethod
+    def _cache_control(full_path: Union[str, "os.PathLike[str]"]) -> str:
+        if Path(full_path).parent.name == IMMUTABLE_DIR:
+            return IMMUTABLE_CACHE_CONTROL
+        return REVALIDATE_CACHE_CONTROL
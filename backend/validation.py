@@ -1,8 +1,11 @@
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
+import numpy as np
 from fastapi import HTTPException
-from .parser.parser import MathematicaParser, ParseError
+from .parser.parser import ParseError, parse_cached
 
 ALLOWED_INTEGRATORS = {"RK45", "Radau", "BDF", "DOP853"}
+# stored / transmitted trajectory dtype, see worker.manager.RESULT_PRECISIONS
+ALLOWED_PRECISIONS = {"f32", "f64"}
 
 
 def _make_problem_details(title: str, errors: List[Dict[str, Any]]):
@@ -14,6 +17,18 @@ def _make_problem_details(title: str, errors: List[Dict[str, Any]]):
     }
 
 
+def _numeric_params(params: Any) -> Optional[Dict[str, float]]:
+    """params as passed to the worker's parse, or None if they are absent or invalid."""
+    if not params or not isinstance(params, dict):
+        return None
+    try:
+        for v in params.values():
+            float(v)
+    except (TypeError, ValueError):
+        return None
+    return params
+
+
 def validate_job_request(data: Dict[str, Any]) -> None:
     """
     Validate a parsed JobRequest dict and raise HTTPException(400) with
@@ -26,9 +41,9 @@ def validate_job_request(data: Dict[str, Any]) -> None:
     if not isinstance(eq, str) or not eq.strip():
         errors.append({"field": "equations", "message": "Equations must be a non-empty string."})
     else:
-        p = MathematicaParser()
         try:
-            f, state_vars = p.parse(eq)
+            # same cache key as the worker's parse, so the job reuses this compiled callable
+            f, state_vars = parse_cached(eq, _numeric_params(data.get("parameters")))
         except ParseError as e:
             errors.append({"field": "equations", "message": f"Failed to parse equations: {e}"})
             state_vars = None
@@ -51,17 +66,25 @@ def validate_job_request(data: Dict[str, Any]) -> None:
     if not (isinstance(ics, list) and len(ics) >= 1):
         errors.append({"field": "initial_conditions", "message": "initial_conditions must be a non-empty array of vectors."})
     else:
-        # ensure each is a list of numbers and consistent length
-        lengths = []
-        for idx, row in enumerate(ics):
-            if not isinstance(row, list) or not row:
-                errors.append({"field": f"initial_conditions[{idx}]", "message": "each initial condition must be a non-empty array of numbers."})
-                continue
-            try:
-                _ = [float(x) for x in row]
-            except Exception:
-                errors.append({"field": f"initial_conditions[{idx}]", "message": "initial condition values must be numeric."})
-            lengths.append(len(row))
+        # ensure each is a list of numbers and consistent length; one conversion in C
+        # covers the common well-formed case, the row loop only runs to report errors
+        try:
+            ic_array = np.asarray(ics, dtype=float)
+        except (TypeError, ValueError):
+            ic_array = None
+        if ic_array is not None and ic_array.ndim == 2 and ic_array.shape[1] > 0:
+            lengths = [ic_array.shape[1]]
+        else:
+            lengths = []
+            for idx, row in enumerate(ics):
+                if not isinstance(row, list) or not row:
+                    errors.append({"field": f"initial_conditions[{idx}]", "message": "each initial condition must be a non-empty array of numbers."})
+                    continue
+                try:
+                    _ = [float(x) for x in row]
+                except Exception:
+                    errors.append({"field": f"initial_conditions[{idx}]", "message": "initial condition values must be numeric."})
+                lengths.append(len(row))
         if lengths:
             if len(set(lengths)) != 1:
                 errors.append({"field": "initial_conditions", "message": "All initial condition vectors must have the same length."})
@@ -92,19 +115,26 @@ def validate_job_request(data: Dict[str, Any]) -> None:
                     errors.append({"field": "integrator.max_step", "message": "max_step must be positive or null."})
             except Exception:
                 errors.append({"field": "integrator.max_step", "message": "max_step must be a number or null."})
+        precision = integrator.get("precision")
+        if precision is not None and precision not in ALLOWED_PRECISIONS:
+            errors.append({"field": "integrator.precision", "message": f"Unsupported result precision: {precision}. Allowed: {sorted(ALLOWED_PRECISIONS)}"})
 
     # parameters: must be dict of numeric values (if present)
     params = data.get("parameters", {}) or {}
     if not isinstance(params, dict):
         errors.append({"field": "parameters", "message": "parameters must be an object mapping names to numbers."})
     else:
-        for k, v in params.items():
+        for k in params:
             if not isinstance(k, str):
                 errors.append({"field": "parameters", "message": "parameter names must be strings."})
-            try:
-                _ = float(v)
-            except Exception:
-                errors.append({"field": f"parameters.{k}", "message": "parameter values must be numeric."})
+        try:
+            np.fromiter(params.values(), dtype=float, count=len(params))
+        except Exception:
+            for k, v in params.items():
+                try:
+                    _ = float(v)
+                except Exception:
+                    errors.append({"field": f"parameters.{k}", "message": "parameter values must be numeric."})
 
     if errors:
         raise HTTPException(status_code=400, detail=_make_problem_details("Invalid request payload", errors))
\ No newline at end of file
@@ -11,61 +11,136 @@ Design notes:
   simple in-process runner to keep the prototype self-contained.
 """
 import asyncio
+import threading
 import traceback
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import logging
 from pathlib import Path
 import numpy as np
 
 from backend.db import save_job_result, update_job_status, save_job_request
-from backend.parser.parser import MathematicaParser, ParseError
-from backend.solvers.scipy_solver import ScipySolver
+from backend.parser.parser import ParseError, NUMBA_AVAILABLE, parse_cached, parse_numba_cached, parse_lsoda_cached
+from backend.solvers.abstract_solver import IntegratorOptions
+from backend.solvers.scipy_solver import ScipySolver, NUMBALSODA_AVAILABLE
 from backend.solvers.numba_runner import NumbaRunner
 from backend.solvers.abstract_solver import SolverError
-from backend.ws import broadcast
+from backend.ws import broadcast, has_subscribers
+
+
+def _marker_path() -> Path:
+    repo_root = Path(__file__).resolve().parent.parent.parent
+    if (repo_root / ".git").exists():
+        # Running from repo
+        return Path(__file__).resolve().parent.parent / "worker_runs.log"
+    # Installed package
+    return Path.home() / ".eqpp" / "worker_runs.log"
+
+
+def _make_marker_logger() -> logging.Logger:
+    """
+    Logger for the START/FINISHED/... run markers in worker_runs.log. One FileHandler
+    (opened on first use) keeps a single file handle for the whole process instead of an
+    open/append/close per marker. Markers are plain "<EVENT> <job_id>" lines.
+    """
+    marker_logger = logging.getLogger(__name__ + ".marker")
+    marker_logger.setLevel(logging.INFO)
+    marker_logger.propagate = False
+    if not marker_logger.handlers:
+        try:
+            path = _marker_path()
+            path.parent.mkdir(parents=True, exist_ok=True)
+            handler = logging.FileHandler(path, encoding="utf-8", delay=True)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            marker_logger.addHandler(handler)
+        except Exception:
+            logging.getLogger(__name__).exception("Failed to set up worker run marker log")
+    return marker_logger
+
+
+_marker_logger = _make_marker_logger()
 
 
 def _choose_solver(integrator: Dict[str, Any]):
     backend = integrator.get("backend", None) or integrator.get("backend_hint", None) or integrator.get("method", None)
     # normalized hint
+    if isinstance(backend, str) and backend.lower() == "numbalsoda":
+        # compiled LSODA (or DOP853 when asked for) via ScipySolver's numbalsoda fast path
+        method = "DOP853" if integrator.get("method") == "DOP853" else "LSODA"
+        return ScipySolver(IntegratorOptions(method=method, backend="numbalsoda"))
     if isinstance(backend, str) and backend.lower().startswith("numba"):
         return NumbaRunner()
-    # default to SciPy
+    # default to SciPy; "joint_batch" opts in to integrating all ICs as one system
+    if integrator.get("joint_batch"):
+        return ScipySolver(IntegratorOptions(backend="scipy", extras={"joint_batch": True}))
     return ScipySolver()
 
 
-def _format_result(times: np.ndarray, trajectories: np.ndarray):
-    # trajectories may be shaped (n_ic, nt, ndim) or (nt, ndim) for single
-    # normalize to list of trajectories per initial condition: list of (nt, ndim)
-    if trajectories.ndim == 3:
-        # (n_ic, nt, ndim) -> list of lists
-        trajs = [[[float(x) for x in row] for row in traj] for traj in trajectories]
-    elif trajectories.ndim == 2:
+# dtype of stored / sent trajectories per integrator.precision; integration is always float64
+RESULT_PRECISIONS = {"f32": np.float32, "f64": np.float64}
+DEFAULT_RESULT_PRECISION = "f32"
+
+
+def _format_result(times: np.ndarray, trajectories: np.ndarray, precision: str = DEFAULT_RESULT_PRECISION):
+    """
+    Job result as C-contiguous arrays: times (nt,) float64 and trajectories (n_ic, nt, ndim)
+    in the requested precision. float32 (default) is plenty for plotting and halves the
+    stored and transmitted size. Arrays are serialized by backend.responses.dumps (orjson
+    writes float32 in its shortest form) or packed raw for msgpack WebSocket clients.
+    """
+    trajectories = np.ascontiguousarray(trajectories, dtype=RESULT_PRECISIONS[precision])
+    if trajectories.ndim == 2:
         # (nt, ndim) -> single IC: wrap
-        trajs = [[[float(x) for x in row] for row in trajectories]]
-    else:
-        # unexpected shape; attempt to convert
-        trajs = trajectories.tolist()
-    return {"times": [float(t) for t in times], "trajectories": trajs}
+        trajectories = trajectories[np.newaxis]
+    return {"times": np.ascontiguousarray(times, dtype=np.float64), "trajectories": trajectories}
+
+
+_bg_loop: Optional[asyncio.AbstractEventLoop] = None
+_bg_loop_lock = threading.Lock()
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    """Event loop running forever on a daemon thread, started on first use."""
+    global _bg_loop
+    if _bg_loop is None:
+        with _bg_loop_lock:
+            if _bg_loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="ws-broadcast", daemon=True).start()
+                _bg_loop = loop
+    return _bg_loop
 
 
 def _schedule_broadcast(job_id: str, message: Dict[str, Any]) -> None:
     """
-    Schedule a broadcast to connected WebSocket clients. This helper will attempt
-    to schedule the async broadcast using the running event loop when possible.
-    If no running loop exists (e.g., this function runs in a worker thread), it
-    will run the broadcast synchronously via a temporary event loop.
+    Schedule a broadcast to connected WebSocket clients without waiting for it.
+
+    On an event loop thread the broadcast becomes a task. From a worker thread it is
+    submitted to the app loop that owns the job (and its WebSockets) when known, otherwise
+    to a persistent background loop, instead of spinning up a new loop per message.
+    Nothing is scheduled when no client is subscribed to the job.
     """
+    if not has_subscribers(job_id):
+        return
     try:
         loop = asyncio.get_running_loop()
         # running loop -> schedule task
         loop.create_task(broadcast(job_id, message))
+        return
     except RuntimeError:
-        # no running loop -> run it to completion in a new loop
-        try:
-            asyncio.run(broadcast(job_id, message))
-        except Exception as e:
-            logging.getLogger(__name__).exception("Failed to run broadcast for job %s: %s", job_id, e)
+        pass
+    from backend.app import jobs  # Import here to avoid circular import
+    loop = jobs.get(job_id, {}).get("loop")
+    if loop is None or not loop.is_running():
+        loop = _background_loop()
+    future = asyncio.run_coroutine_threadsafe(broadcast(job_id, message), loop)
+    future.add_done_callback(lambda f: _log_broadcast_failure(job_id, f))
+
+
+def _log_broadcast_failure(job_id: str, future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        logging.getLogger(__name__).error(
+            "Failed to run broadcast for job %s", job_id, exc_info=future.exception()
+        )
 
 
 def _broadcast_status(job_id: str, status: str, **extra: Any) -> None:
@@ -76,8 +151,24 @@ def _broadcast_status(job_id: str, status: str, **extra: Any) -> None:
 
 
 def _broadcast_results(job_id: str, result: Dict[str, Any]) -> None:
+    # result may carry ndarrays; ws.encode packs them as raw bytes for msgpack clients
     _schedule_broadcast(job_id, {"type": "results", "payload": result})
 
+
+def _signal_done(job: Dict[str, Any]) -> None:
+    """
+    Set the job's asyncio.Event so WebSocket waiters wake up. The event belongs to the
+    app's event loop, so when called from a worker thread the set is handed to that loop.
+    """
+    done = job.get("done")
+    if done is None:
+        return
+    loop = job.get("loop")
+    if loop is not None and loop.is_running():
+        loop.call_soon_threadsafe(done.set)
+    else:
+        done.set()
+
 def enqueue_job(job_id: str, request: Dict[str, Any]) -> None:
     """
     Entry point used by FastAPI BackgroundTasks to run a submitted job.
@@ -91,21 +182,8 @@ def enqueue_job(job_id: str, request: Dict[str, Any]) -> None:
     from backend.app import jobs  # Import here to avoid circular import
     logger = logging.getLogger(__name__)
     logger.info("enqueue_job called for job %s", job_id)
-    # ensure marker_path is always defined so later cleanup logging won't cause UnboundLocalError
-    repo_root = Path(__file__).resolve().parent.parent.parent
-    if (repo_root / ".git").exists():
-        # Running from repo
-        marker_path = Path(__file__).resolve().parent.parent / "worker_runs.log"
-    else:
-        # Installed package
-        marker_path = Path.home() / ".eqpp" / "worker_runs.log"
-        marker_path.parent.mkdir(parents=True, exist_ok=True)
-    # write a tiny run marker to a file so we can observe which process executed the job
-    try:
-        with open(marker_path, "a", encoding="utf-8") as f:
-            f.write(f"START {job_id}\n")
-    except Exception:
-        logger.exception("Failed to write worker run marker for job %s", job_id)
+    # tiny run marker so we can observe which process executed the job
+    _marker_logger.info("START %s", job_id)
 
     try:
         logger.info("Starting job %s", job_id)
@@ -117,9 +195,21 @@ def enqueue_job(job_id: str, request: Dict[str, Any]) -> None:
         jobs[job_id].pop("warnings", None)
         _broadcast_status(job_id, "running")
 
-        parser = MathematicaParser()
+        integrator = request.get("integrator", {}) or {}
+        # pick solver
+        solver = _choose_solver(integrator)
+        logger.info("Job %s using solver %s", job_id, getattr(solver, "options", "unknown"))
+
         try:
-            func, state_vars = parser.parse(request["equations"])
+            if solver.options.backend == "numbalsoda" and NUMBALSODA_AVAILABLE and NUMBA_AVAILABLE:
+                func, state_vars, _ = parse_lsoda_cached(request["equations"])
+            elif isinstance(solver, NumbaRunner) and NUMBA_AVAILABLE:
+                # njit RHS lets NumbaRunner run the whole RK4 loop in compiled code
+                func, state_vars, _ = parse_numba_cached(request["equations"])
+            else:
+                # the parameters are fixed for the whole job, so bake them into the RHS;
+                # validate_job_request already compiled this exact callable
+                func, state_vars = parse_cached(request["equations"], params=request.get("parameters") or None)
         except ParseError as e:
             logger.warning("Parser failure for job %s: %s", job_id, e)
             update_job_status(job_id, "failed")
@@ -127,15 +217,11 @@ def enqueue_job(job_id: str, request: Dict[str, Any]) -> None:
             jobs[job_id]["error"] = str(e)
             save_job_result(job_id, {"job_id": job_id, "error": f"parser failure: {e}"})
             _broadcast_status(job_id, "failed", error=str(e))
-            with open(marker_path, "a", encoding="utf-8") as f:
-                f.write(f"FAILED_PARSE {job_id}\n")
+            _signal_done(jobs[job_id])
+            _marker_logger.info("FAILED_PARSE %s", job_id)
             return
 
         t0, tf = float(request["timespan"][0]), float(request["timespan"][1])
-        integrator = request.get("integrator", {}) or {}
-        # pick solver
-        solver = _choose_solver(integrator)
-        logger.info("Job %s using solver %s", job_id, getattr(solver, "options", "unknown"))
 
         # build t_eval
         t_eval = None
@@ -172,17 +258,17 @@ def enqueue_job(job_id: str, request: Dict[str, Any]) -> None:
                 },
             )
             _broadcast_status(job_id, "failed", error=str(err), details=getattr(err, "details", {}))
-            with open(marker_path, "a", encoding="utf-8") as f:
-                f.write(f"FAILED_SOLVER {job_id}\n")
+            _signal_done(jobs[job_id])
+            _marker_logger.info("FAILED_SOLVER %s", job_id)
             return
 
-        result = _format_result(times, trajs)
+        result = _format_result(times, trajs, integrator.get("precision") or DEFAULT_RESULT_PRECISION)
         result["meta"] = {
             "equations": request["equations"],
             "name": request.get("name", ""),
             "initial_conditions": request["initial_conditions"]
         }
-        # persist results
+        # persist results; wait for the commit so a finished job is never lost on shutdown
         save_job_result(
             job_id,
             {
@@ -190,6 +276,7 @@ def enqueue_job(job_id: str, request: Dict[str, Any]) -> None:
                 **result,
                 "solver": solver.options.backend if hasattr(solver, "options") else "unknown",
             },
+            durable=True,
         )
         update_job_status(job_id, "finished")
         jobs[job_id]["status"] = "finished"
@@ -197,11 +284,9 @@ def enqueue_job(job_id: str, request: Dict[str, Any]) -> None:
         logger.info("Job %s finished; broadcasting result", job_id)
         _broadcast_status(job_id, "finished")
         _broadcast_results(job_id, result)
-        try:
-            with open(marker_path, "a", encoding="utf-8") as f:
-                f.write(f"FINISHED {job_id}\n")
-        except Exception:
-            logger.exception("Failed to write worker run finished marker for job %s", job_id)
+        # after the broadcasts: /ws clients are closed once they see the job done
+        _signal_done(jobs[job_id])
+        _marker_logger.info("FINISHED %s", job_id)
     except Exception as e:
         # capture traceback and persist as failure
         tb = traceback.format_exc()
@@ -214,8 +299,5 @@ def enqueue_job(job_id: str, request: Dict[str, Any]) -> None:
         if isinstance(e, SolverError):
             extra["details"] = getattr(e, "details", {})
         _broadcast_status(job_id, "failed", error=str(e), **extra)
-        try:
-            with open(marker_path, "a", encoding="utf-8") as f:
-                f.write(f"EXCEPTION {job_id}\n")
-        except Exception:
-            logger.exception("Failed to write worker run exception marker for job %s", job_id)
\ No newline at end of file
+        _signal_done(jobs[job_id])
+        _marker_logger.info("EXCEPTION %s", job_id)
\ No newline at end of file
@@ -1,63 +1,125 @@
 import asyncio
-from typing import Dict, Set, Any
+import threading
+from typing import Any, Dict, Tuple, Union
+import numpy as np
 from fastapi import WebSocket
 
+from .responses import dumps
+
+try:
+    import msgpack as _msgpack
+
+    MSGPACK_AVAILABLE = True
+except Exception:
+    MSGPACK_AVAILABLE = False
+
 # Simple in-memory WebSocket broker.
-# - register(job_id, websocket) keeps track of clients interested in a job
+# - register(job_id, websocket, protocol) keeps track of clients interested in a job
 # - unregister(job_id, websocket) removes client
-# - broadcast(job_id, message) sends JSON-serializable message to all registered clients
+# - broadcast(job_id, message) sends message to all registered clients, encoded once per protocol
+#
+# Clients pick the wire protocol when connecting (/ws/{job_id}?protocol=msgpack):
+# - "json" (default): text frames; ndarrays in a message are serialized as nested lists.
+# - "msgpack": binary MessagePack frames; ndarrays are packed as
+#   {"dtype": "<f8", "shape": [...], "data": <raw bytes>} instead of text numbers.
+#   Falls back to JSON when msgpack is not installed.
 #
 # Note: This is an in-process, best-effort broker suitable for a single-worker prototype.
 # In production use a message broker (Redis pub/sub, NATS, Kafka) to scale across processes/nodes.
 
-_job_clients: Dict[str, Set[WebSocket]] = {}
-_lock = asyncio.Lock()
+JSON_PROTOCOL = "json"
+MSGPACK_PROTOCOL = "msgpack"
 
+# job_id -> ((websocket, protocol), ...). Tuples are replaced, never mutated
+# (copy-on-write under _lock), so broadcast reads a consistent snapshot without locking.
+# A threading lock, not an asyncio one: broadcasts may run on another thread's loop, and
+# the critical sections never await.
+_job_clients: Dict[str, Tuple[Tuple[WebSocket, str], ...]] = {}
+_lock = threading.Lock()
 
-async def register(job_id: str, websocket: WebSocket) -> None:
-    async with _lock:
-        clients = _job_clients.get(job_id)
-        if clients is None:
-            clients = set()
-            _job_clients[job_id] = clients
-        clients.add(websocket)
+
+def negotiate_protocol(requested: str) -> str:
+    """Protocol actually used for a client that asked for `requested`."""
+    if requested == MSGPACK_PROTOCOL and MSGPACK_AVAILABLE:
+        return MSGPACK_PROTOCOL
+    return JSON_PROTOCOL
+
+
+def _pack_ndarray(obj: Any) -> Any:
+    if isinstance(obj, np.ndarray):
+        arr = np.ascontiguousarray(obj)
+        return {"dtype": arr.dtype.str, "shape": list(arr.shape), "data": arr.tobytes()}
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Cannot serialize {type(obj).__name__}")
+
+
+def encode(message: Any, protocol: str) -> Union[str, bytes]:
+    """Encode message for the wire: bytes for msgpack, str for JSON."""
+    if protocol == MSGPACK_PROTOCOL:
+        return _msgpack.packb(message, default=_pack_ndarray)
+    return dumps(message).decode("utf-8")
+
+
+async def _send_encoded(websocket: WebSocket, data: Union[str, bytes]) -> None:
+    if isinstance(data, bytes):
+        await websocket.send_bytes(data)
+    else:
+        await websocket.send_text(data)
+
+
+async def send(websocket: WebSocket, message: Any, protocol: str = JSON_PROTOCOL) -> None:
+    await _send_encoded(websocket, encode(message, protocol))
+
+
+async def register(job_id: str, websocket: WebSocket, protocol: str = JSON_PROTOCOL) -> None:
+    entry = (websocket, negotiate_protocol(protocol))
+    with _lock:
+        _job_clients[job_id] = _job_clients.get(job_id, ()) + (entry,)
 
 
 async def unregister(job_id: str, websocket: WebSocket) -> None:
-    async with _lock:
-        clients = _job_clients.get(job_id)
-        if not clients:
-            return
-        clients.discard(websocket)
-        if not clients:
-            # remove empty set
+    _remove_clients(job_id, (websocket,))
+
+
+def _remove_clients(job_id: str, websockets: Tuple[WebSocket, ...]) -> None:
+    with _lock:
+        clients = tuple(c for c in _job_clients.get(job_id, ()) if c[0] not in websockets)
+        if clients:
+            _job_clients[job_id] = clients
+        else:
+            # remove empty entry
             _job_clients.pop(job_id, None)
 
 
+def has_subscribers(job_id: str) -> bool:
+    """
+    Lock-free check used to skip building broadcasts nobody will receive. A client
+    registering concurrently may be missed; it still gets the next message.
+    """
+    return bool(_job_clients.get(job_id))
+
+
 async def broadcast(job_id: str, message: Any) -> None:
     """
     Send message to all connected clients for job_id.
     If a send fails, remove that client.
     """
-    async with _lock:
-        clients = list(_job_clients.get(job_id, set()))
-
+    clients = _job_clients.get(job_id, ())
     if not clients:
+        # common case (headless runs): no lock, no encoding
         return
 
-    stale = []
-    for ws in clients:
-        try:
-            await ws.send_json(message)
-        except Exception:
-            # mark stale
-            stale.append(ws)
+    # serialize once per protocol, not once per client
+    encoded: Dict[str, Union[str, bytes]] = {}
+    for protocol in {protocol for _, protocol in clients}:
+        encoded[protocol] = encode(message, protocol)
 
+    # concurrent fan-out: a slow client no longer delays the others
+    results = await asyncio.gather(
+        *(_send_encoded(ws, encoded[protocol]) for ws, protocol in clients),
+        return_exceptions=True,
+    )
+    stale = tuple(ws for (ws, _), result in zip(clients, results) if isinstance(result, Exception))
     if stale:
-        async with _lock:
-            s = _job_clients.get(job_id)
-            if s:
-                for ws in stale:
-                    s.discard(ws)
-                if not s:
-                    _job_clients.pop(job_id, None)
\ No newline at end of file
+        _remove_clients(job_id, stale)
@@ -0,0 +1,62 @@
+import importlib.util
+import sys
+import types
+from pathlib import Path
+from typing import Dict, Tuple
+
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]  # project root
+
+# modules already executed by load_module_from_path, keyed by (name, rel_path)
+_MOD_CACHE: Dict[Tuple[str, str], types.ModuleType] = {}
+
+
+def load_module_from_path(name: str, rel_path: str):
+    key = (name, rel_path)
+    if key in _MOD_CACHE:
+        return _MOD_CACHE[key]
+    path = ROOT / rel_path
+    spec = importlib.util.spec_from_file_location(name, str(path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)  # type: ignore
+    _MOD_CACHE[key] = module
+    sys.modules[name] = module
+    return module
+
+
+# load modules by path to avoid package import issues in test env
+@pytest.fixture(scope="session")
+def parser_mod():
+    return load_module_from_path("parser", "backend/parser/parser.py")
+
+
+@pytest.fixture(scope="session")
+def abstract_mod():
+    return load_module_from_path("abstract", "backend/solvers/abstract_solver.py")
+
+
+@pytest.fixture(scope="session")
+def scipy_mod():
+    return load_module_from_path("scipy_solver", "backend/solvers/scipy_solver.py")
+
+
+@pytest.fixture(scope="session")
+def numba_mod():
+    return load_module_from_path("numba_runner", "backend/solvers/numba_runner.py")
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _warm_numba(parser_mod, numba_mod):
+    """
+    Compile the jitted RK4 loops once, up front, so the LLVM codegen cost is not charged
+    to whichever numba test happens to run first.
+    """
+    if not numba_mod.NUMBA_AVAILABLE:
+        return
+    kernel, _, _ = parser_mod.MathematicaParser().parse_numba("x'[t] == -x[t]")
+    runner = numba_mod.NumbaRunner()
+    t_eval = np.linspace(0.0, 1.0, 3)
+    runner.solve(kernel, (0.0, 1.0), np.array([1.0]), t_eval=t_eval)
+    runner.solve_batch(kernel, (0.0, 1.0), np.array([[1.0], [2.0]]), t_eval=t_eval)
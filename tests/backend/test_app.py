@@ -0,0 +1,339 @@
+import asyncio
+import json
+import logging
+from pathlib import Path
+
+import numpy as np
+import numpy.testing as npt
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory):
+    """
+    TestClient for backend.app, with the job DB and the worker run markers redirected away
+    from the repo copies (backend/jobs.sqlite, backend/worker_runs.log).
+    """
+    from backend import db
+    from backend.app import app
+    from backend.worker import manager
+
+    tmp = tmp_path_factory.mktemp("app")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(db, "DB_PATH", tmp / "jobs.sqlite")
+        mp.setattr(manager, "_marker_logger", logging.getLogger(__name__ + ".markers"))
+        # entering the client runs startup (init_db, static mount) and keeps one event loop
+        # alive for all requests, as in the real server
+        with TestClient(app) as c:
+            yield c
+
+
+def test_slope_field_constant_rhs_returns_one_value_per_grid_point(client):
+    r = client.post(
+        "/slope_field",
+        json={"equations": "{x'[t], y'[t]} == {1, 2}", "x_min": -1, "x_max": 1, "y_min": -1, "y_max": 1, "grid_size": 5},
+    )
+    assert r.status_code == 200
+    body = r.json()
+    for key in ("x", "y", "u", "v"):
+        assert len(body[key]) == 25
+    npt.assert_allclose(body["u"], np.ones(25))
+    npt.assert_allclose(body["v"], np.full(25, 2.0))
+
+
+def test_json_fallback_writes_float32_in_shortest_form(monkeypatch):
+    from backend import responses
+
+    content = {"trajectories": np.array([[0.1, 1 / 3]], dtype=np.float32), "t": np.array([0.1])}
+    monkeypatch.setattr(responses, "ORJSON_AVAILABLE", False)
+    # not the float64 repr of the widened value (0.10000000149011612)
+    assert responses.dumps(content) == b'{"trajectories":[[0.1,0.33333334]],"t":[0.1]}'
+    assert responses.FastJSONResponse(content).body == b'{"trajectories":[[0.1,0.33333334]],"t":[0.1]}'
+
+
+def test_results_without_orjson_match_orjson_output(client, monkeypatch):
+    from backend import responses
+
+    if not responses.ORJSON_AVAILABLE:
+        pytest.skip("orjson not installed")
+    r = client.post(
+        "/submit",
+        json={"equations": "x'[t] == -x[t]", "timespan": [0, 2], "initial_conditions": [[1.0], [0.3]]},
+    )
+    job_id = r.json()["job_id"]
+    # BackgroundTasks run before the TestClient call returns, so the job is done here
+    with_orjson = client.get(f"/results/{job_id}")
+    assert with_orjson.status_code == 200
+    monkeypatch.setattr(responses, "ORJSON_AVAILABLE", False)
+    without_orjson = client.get(f"/results/{job_id}")
+    assert without_orjson.json() == with_orjson.json()
+
+
+def _submit_decay_job(client) -> str:
+    r = client.post(
+        "/submit",
+        json={"equations": "x'[t] == -x[t]", "timespan": [0, 1], "initial_conditions": [[1.0]]},
+    )
+    assert r.status_code == 200
+    return r.json()["job_id"]
+
+
+def _sse_frames(body: bytes):
+    # (event, data) per frame; comment frames (":keepalive") come back as (None, line)
+    frames = []
+    for chunk in body.split(b"\n\n"):
+        if not chunk:
+            continue
+        if chunk.startswith(b":"):
+            frames.append((None, chunk))
+            continue
+        fields = dict(line.split(b": ", 1) for line in chunk.split(b"\n"))
+        frames.append((fields[b"event"].decode(), json.loads(fields[b"data"])))
+    return frames
+
+
+def test_events_unknown_job_is_404(client):
+    assert client.get("/events/no-such-job").status_code == 404
+
+
+def test_events_stream_ends_with_results_for_finished_job(client):
+    job_id = _submit_decay_job(client)
+    r = client.get(f"/events/{job_id}")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/event-stream")
+    assert r.headers["cache-control"] == "no-cache"
+    (ev1, status), (ev2, result) = _sse_frames(r.content)
+    assert (ev1, status) == ("status", {"job_id": job_id, "status": "finished"})
+    assert ev2 == "results"
+    npt.assert_allclose(result["trajectories"][0], np.exp(-np.array(result["times"]))[:, None], rtol=1e-4)
+
+
+def test_events_stream_sends_keepalives_until_the_job_fails(monkeypatch):
+    from backend import app as app_mod
+
+    monkeypatch.setattr(app_mod, "SSE_KEEPALIVE_INTERVAL", 0.01)
+
+    async def collect():
+        job = {"status": "running", "done": asyncio.Event()}
+
+        def fail():
+            job["status"], job["error"] = "failed", "boom"
+            job["done"].set()
+
+        asyncio.get_running_loop().call_later(0.1, fail)
+        return b"".join([chunk async for chunk in app_mod._job_event_stream("j1", job)])
+
+    frames = _sse_frames(asyncio.run(collect()))
+    assert frames[0] == ("status", {"job_id": "j1", "status": "running"})
+    assert frames[1:-1] and all(frame == (None, b":keepalive") for frame in frames[1:-1])
+    # failed jobs end with their status, without a results event
+    assert frames[-1] == ("status", {"job_id": "j1", "status": "failed", "error": "boom"})
+
+
+async def _running_loop():
+    return asyncio.get_running_loop()
+
+
+def test_ws_unknown_job_reports_not_found(client):
+    with client.websocket_connect("/ws/no-such-job") as websocket:
+        assert websocket.receive_json() == {"status": "connected", "job_id": "no-such-job", "protocol": "json"}
+        assert websocket.receive_json() == {"status": "not_found", "job_id": "no-such-job"}
+
+
+def test_ws_sends_finished_frame_for_submitted_job(client):
+    job_id = _submit_decay_job(client)
+    with client.websocket_connect(f"/ws/{job_id}") as websocket:
+        assert websocket.receive_json()["status"] == "connected"
+        message = websocket.receive_json()
+    assert message["status"] == "finished"
+    assert set(message["result"]) >= {"times", "trajectories", "meta"}
+
+
+def test_ws_wakes_up_when_the_worker_thread_finishes_the_job(client):
+    from backend.app import jobs
+    from backend.worker.manager import enqueue_job
+
+    job_id = "ws-wakeup-job"
+    request = {"equations": "x'[t] == -x[t]", "timespan": [0, 1], "initial_conditions": [[1.0], [2.0]]}
+    # as /submit does: the event belongs to the app's loop (the client's portal loop)
+    jobs[job_id] = {"status": "queued", "request": request, "done": asyncio.Event(), "loop": client.portal.call(_running_loop)}
+    with client.websocket_connect(f"/ws/{job_id}") as websocket:
+        assert websocket.receive_json()["status"] == "connected"
+        # run the worker on this thread, off the event loop, like the BackgroundTasks threadpool
+        enqueue_job(job_id, request)
+        broadcasts, message = _receive_until_final(websocket.receive_json)
+    # the registered client gets the worker's broadcasts before the final frame
+    assert [(m["type"], m["payload"].get("status")) for m in broadcasts] == [
+        ("status", "running"),
+        ("status", "finished"),
+        ("results", None),
+    ]
+    assert message["status"] == "finished"
+    assert np.asarray(message["result"]["trajectories"]).shape == (2, 201, 1)
+    assert np.asarray(broadcasts[-1]["payload"]["trajectories"]).shape == (2, 201, 1)
+
+
+def _receive_until_final(receive):
+    # worker broadcasts are {"type", "payload"}; /ws ends with one {"status", ...} frame
+    broadcasts = []
+    while True:
+        message = receive()
+        if "type" not in message:
+            return broadcasts, message
+        broadcasts.append(message)
+
+
+def test_ws_msgpack_results_frame_decodes_to_arrays(client):
+    from backend import ws
+    from backend.app import jobs
+    from backend.worker.manager import enqueue_job
+
+    if not ws.MSGPACK_AVAILABLE:
+        pytest.skip("msgpack not installed")
+    import msgpack
+
+    def unpack_array(obj):
+        if set(obj) == {"dtype", "shape", "data"}:
+            return np.frombuffer(obj["data"], dtype=obj["dtype"]).reshape(obj["shape"])
+        return obj
+
+    job_id = "ws-msgpack-job"
+    request = {"equations": "x'[t] == -x[t]", "timespan": [0, 1], "initial_conditions": [[1.0], [2.0]]}
+    jobs[job_id] = {"status": "queued", "request": request, "done": asyncio.Event(), "loop": client.portal.call(_running_loop)}
+    with client.websocket_connect(f"/ws/{job_id}?protocol=msgpack") as websocket:
+        assert msgpack.unpackb(websocket.receive_bytes())["protocol"] == "msgpack"
+        enqueue_job(job_id, request)
+        broadcasts, _ = _receive_until_final(lambda: msgpack.unpackb(websocket.receive_bytes(), object_hook=unpack_array))
+    result = broadcasts[-1]
+    assert result["type"] == "results"
+    trajectories, times = result["payload"]["trajectories"], result["payload"]["times"]
+    assert trajectories.dtype == np.float32 and trajectories.shape == (2, 201, 1)
+    npt.assert_allclose(trajectories[:, :, 0], np.array([[1.0], [2.0]]) * np.exp(-times), rtol=1e-4)
+
+
+class _FakeWebSocket:
+    def __init__(self, fail: bool = False) -> None:
+        self.fail = fail
+        self.sent = []
+
+    async def send_text(self, data):
+        if self.fail:
+            raise RuntimeError("connection closed")
+        self.sent.append(data)
+
+    send_bytes = send_text
+
+
+def test_ws_broadcast_fans_out_and_prunes_dead_clients():
+    from backend import ws
+
+    job_id = "fanout-job"
+    live, live2, dead = _FakeWebSocket(), _FakeWebSocket(), _FakeWebSocket(fail=True)
+    message = {"type": "status", "payload": {"status": "running"}}
+
+    async def run():
+        for sock in (live, dead, live2):
+            await ws.register(job_id, sock, ws.JSON_PROTOCOL)
+        await ws.broadcast(job_id, message)
+        # the dead client was dropped after the first failed send
+        assert [c[0] for c in ws._job_clients[job_id]] == [live, live2]
+        await ws.broadcast(job_id, message)
+        for sock in (live, live2):
+            await ws.unregister(job_id, sock)
+
+    asyncio.run(run())
+    assert live.sent == live2.sent == [ws.encode(message, ws.JSON_PROTOCOL)] * 2
+    assert not ws.has_subscribers(job_id)
+
+
+def test_ws_closes_when_the_job_wait_times_out(client, monkeypatch):
+    from starlette.websockets import WebSocketDisconnect
+
+    from backend import app as app_mod
+
+    monkeypatch.setattr(app_mod, "WS_JOB_WAIT_TIMEOUT", 0.05)
+    job_id = "ws-stuck-job"
+    app_mod.jobs[job_id] = {"status": "running", "done": asyncio.Event(), "loop": client.portal.call(_running_loop)}
+    with client.websocket_connect(f"/ws/{job_id}") as websocket:
+        assert websocket.receive_json()["status"] == "connected"
+        with pytest.raises(WebSocketDisconnect):
+            websocket.receive_json()
+
+
+@pytest.mark.parametrize(
+    "equations,bounds",
+    [
+        ("{x'[t], y'[t]} == {y[t], -Sin(x[t])}", {}),
+        ("{x'[t], y'[t], z'[t]} == {y[t], -x[t], x[t]*z[t]}", {"z_min": 0, "z_max": 3}),
+    ],
+    ids=["2d", "3d"],
+)
+def test_slope_field_binary_payload_round_trips_to_json(client, equations, bounds):
+    req = {"equations": equations, "x_min": -2, "x_max": 2, "y_min": -1, "y_max": 1, "grid_size": 7, **bounds}
+    expected = client.post("/slope_field", json=req).json()
+    r = client.post("/slope_field", json=req, headers={"Accept": "application/octet-stream"})
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "application/octet-stream"
+    assert r.headers["x-array-dtype"] == "float32"
+    names = r.headers["x-array-fields"].split(",")
+    shape = tuple(int(d) for d in r.headers["x-array-shape"].split(","))
+    packed = np.frombuffer(r.content, dtype="<f4").reshape(shape)
+    assert names == list(expected)
+    assert shape == (len(names), 7 ** (len(names) // 2))
+    for row, name in zip(packed, names):
+        npt.assert_array_equal(row, np.asarray(expected[name], dtype=np.float32))
+
+
+def test_static_files_weak_etag_and_cache_control(tmp_path):
+    from starlette.applications import Starlette
+    from starlette.middleware.gzip import GZipMiddleware
+    from starlette.routing import Mount
+
+    from backend.static_files import IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL, CachedStaticFiles
+
+    (tmp_path / "assets").mkdir()
+    (tmp_path / "index.html").write_text("<!DOCTYPE html><html></html>")
+    (tmp_path / "assets" / "app-3f2a1c.js").write_text("console.log('x');\n" * 100)
+    static_app = Starlette(routes=[Mount("/", CachedStaticFiles(directory=str(tmp_path), html=True))])
+    # same compression as backend.app, which may re-encode the body behind the ETag
+    static_app.add_middleware(GZipMiddleware, minimum_size=512)
+
+    with TestClient(static_app) as c:
+        asset = c.get("/assets/app-3f2a1c.js")
+        assert asset.status_code == 200
+        assert asset.headers["content-encoding"] == "gzip"
+        assert asset.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+        etag = asset.headers["etag"]
+        assert etag.startswith('W/"')
+
+        assert c.get("/assets/app-3f2a1c.js", headers={"If-None-Match": etag}).status_code == 304
+        # weak comparison: the same opaque tag matches with or without the W/ prefix
+        assert c.get("/assets/app-3f2a1c.js", headers={"If-None-Match": etag[2:]}).status_code == 304
+        assert c.get("/assets/app-3f2a1c.js", headers={"If-None-Match": 'W/"0-0"'}).status_code == 200
+
+        index = c.get("/")
+        assert index.headers["cache-control"] == REVALIDATE_CACHE_CONTROL
+        assert c.get("/", headers={"If-None-Match": index.headers["etag"]}).status_code == 304
+
+
+def test_cli_warns_when_the_working_tree_shadows_an_installed_package(tmp_path, monkeypatch, caplog):
+    import site
+
+    from backend import app as app_mod
+    from backend import cli
+
+    installed = tmp_path / "site-packages"
+    (installed / "backend").mkdir(parents=True)
+    (installed / "backend" / "app.py").write_text("")
+    monkeypatch.setattr(site, "getsitepackages", lambda: [str(tmp_path / "empty"), str(installed)])
+    with caplog.at_level(logging.WARNING, logger=cli.logger.name):
+        cli._warn_if_shadowed(Path(app_mod.__file__))
+    assert "shadows the installed package" in caplog.text
+
+    # running the installed copy itself, or with nothing installed, is not a shadowed install
+    caplog.clear()
+    cli._warn_if_shadowed(installed / "backend" / "app.py")
+    monkeypatch.setattr(site, "getsitepackages", lambda: [str(tmp_path / "empty")])
+    cli._warn_if_shadowed(Path(app_mod.__file__))
+    assert "shadows" not in caplog.text
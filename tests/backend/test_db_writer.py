@@ -0,0 +1,96 @@
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from backend.db_writer import DBWriter
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "writer.sqlite"
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, v TEXT)")
+    return path
+
+
+def _rows(path):
+    # a fresh connection only sees committed data
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT id, v FROM t ORDER BY id").fetchall()
+    finally:
+        conn.close()
+
+
+def test_durable_write_is_committed_when_submit_returns(db_path):
+    writer = DBWriter(lambda: sqlite3.connect(db_path), batch_wait=1.0)
+    writer.submit("INSERT INTO t (id, v) VALUES (?, ?)", (1, "a"), durable=True)
+    assert _rows(db_path) == [(1, "a")]
+
+
+def test_durable_write_reraises_its_error(db_path):
+    writer = DBWriter(lambda: sqlite3.connect(db_path))
+    writer.submit("INSERT INTO t (id, v) VALUES (?, ?)", (1, "a"), durable=True)
+    with pytest.raises(sqlite3.IntegrityError):
+        writer.submit("INSERT INTO t (id, v) VALUES (?, ?)", (1, "dup"), durable=True)
+
+
+def test_connect_failure_fails_the_batch_and_the_writer_reconnects(db_path):
+    attempts = []
+
+    def connect():
+        attempts.append(None)
+        if len(attempts) == 1:
+            raise sqlite3.OperationalError("unable to open database file")
+        return sqlite3.connect(db_path)
+
+    writer = DBWriter(connect)
+    # the waiter gets the connection error instead of blocking forever on a dead thread
+    with pytest.raises(sqlite3.OperationalError):
+        writer.submit("INSERT INTO t (id, v) VALUES (?, ?)", (1, "lost"), durable=True, timeout=5.0)
+    writer.submit("INSERT INTO t (id, v) VALUES (?, ?)", (2, "b"), durable=True, timeout=5.0)
+    assert _rows(db_path) == [(2, "b")]
+    assert len(attempts) == 2
+
+
+def test_durable_submit_times_out_when_the_write_is_not_committed(db_path):
+    writer = DBWriter(lambda: sqlite3.connect(db_path))
+    writer.submit("INSERT INTO t (id, v) VALUES (?, ?)", (1, "a"), durable=True)
+    # hold the write lock from another connection so the writer's commit is stuck behind it
+    blocker = sqlite3.connect(db_path, timeout=0)
+    blocker.execute("BEGIN EXCLUSIVE")
+    try:
+        with pytest.raises(TimeoutError):
+            writer.submit("INSERT INTO t (id, v) VALUES (?, ?)", (2, "b"), durable=True, timeout=0.2)
+    finally:
+        blocker.rollback()
+        blocker.close()
+    writer.flush(timeout=10.0)
+    assert _rows(db_path) == [(1, "a"), (2, "b")]
+
+
+def test_queued_writes_are_committed_in_order_after_flush(db_path):
+    writer = DBWriter(lambda: sqlite3.connect(db_path), batch_max=7)
+    for i in range(50):
+        writer.submit("INSERT INTO t (id, v) VALUES (?, ?)", (i, str(i)))
+    # a failing statement inside a batch must not drop the others
+    writer.submit("INSERT INTO t (id, v) VALUES (?, ?)", (3, "dup"))
+    writer.submit("UPDATE t SET v = ? WHERE id = ?", ("last", 49))
+    writer.flush(timeout=5.0)
+    assert _rows(db_path) == [(i, str(i)) for i in range(49)] + [(49, "last")]
+
+
+def test_pending_writes_are_flushed_at_interpreter_exit(db_path):
+    script = (
+        "import sqlite3, sys\n"
+        "from backend.db_writer import DBWriter\n"
+        "w = DBWriter(lambda: sqlite3.connect(sys.argv[1]), batch_wait=0.5)\n"
+        "for i in range(5):\n"
+        "    w.submit('INSERT INTO t (id, v) VALUES (?, ?)', (i, 'x'))\n"
+    )
+    root = Path(__file__).resolve().parents[2]
+    subprocess.run([sys.executable, "-c", script, str(db_path)], cwd=root, check=True, timeout=30)
+    assert _rows(db_path) == [(i, "x") for i in range(5)]
@@ -1,76 +1,303 @@
-import importlib.util
-import os
-from pathlib import Path
 import numpy as np
 import numpy.testing as npt
+import pytest
 
-ROOT = Path(__file__).resolve().parents[2]  # project root
+# Backend modules are loaded by path through the session fixtures in conftest.py
+# (parser_mod, abstract_mod, scipy_mod, numba_mod).
 
 
-def load_module_from_path(name: str, rel_path: str):
-    path = ROOT / rel_path
-    spec = importlib.util.spec_from_file_location(name, str(path))
-    module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(module)  # type: ignore
-    return module
+@pytest.fixture(scope="module")
+def compiled_rhs(parser_mod):
+    # parse the shared equations once per module; values are (f, vars)
+    p = parser_mod.MathematicaParser()
+    return {
+        "decay": p.parse("x'[t] == -x[t]"),
+        "system": p.parse("{x'[t], y'[t]} == {x[t] - y[t], x[t]*y[t]}"),
+    }
 
 
-def test_parser_scalar_and_system():
-    parser_mod = load_module_from_path("parser", "backend/parser/parser.py")
-    MathematicaParser = parser_mod.MathematicaParser
-
-    p = MathematicaParser()
+def test_parser_scalar_and_system(parser_mod, compiled_rhs):
+    p = parser_mod.MathematicaParser()
 
     # scalar ODE
-    f, vars_ = p.parse("x'[t] == -x[t]")
+    f, vars_ = compiled_rhs["decay"]
     assert vars_ == ["x"]
     y = np.array([2.0])
     dy = f(0.0, y, {})
     npt.assert_allclose(dy, np.array([-2.0]), atol=1e-12)
 
     # system
-    f2, vars2 = p.parse("{x'[t], y'[t]} == {x[t] - y[t], x[t]*y[t]}")
+    f2, vars2 = compiled_rhs["system"]
     assert vars2 == ["x", "y"]
     y0 = np.array([1.0, 3.0])
     dy2 = f2(0.0, y0, {})
     npt.assert_allclose(dy2, np.array([1.0 - 3.0, 1.0 * 3.0]), atol=1e-12)
 
+    # Mathematica function names map to numpy
+    f3, _ = p.parse("x'[t] == Sin(x[t]) + Exp(-x[t])")
+    npt.assert_allclose(f3(0.0, np.array([0.5]), {}), np.array([np.sin(0.5) + np.exp(-0.5)]), atol=1e-12)
 
-def test_scipy_solver_exp_decay():
-    # load modules by path to avoid package import issues in test env
-    parser_mod = load_module_from_path("parser", "backend/parser/parser.py")
-    scipy_mod = load_module_from_path("scipy_solver", "backend/solvers/scipy_solver.py")
 
-    MathematicaParser = parser_mod.MathematicaParser
-    ScipySolver = scipy_mod.ScipySolver
-    IntegratorOptions = load_module_from_path("abstract", "backend/solvers/abstract_solver.py").IntegratorOptions
+def test_parser_bakes_parameter_constants(parser_mod):
+    p = parser_mod.MathematicaParser()
 
-    p = MathematicaParser()
-    f, vars_ = p.parse("x'[t] == -x[t]")
-    solver = ScipySolver(IntegratorOptions(method="RK45"))
-    t_span = (0.0, 2.0)
-    t_eval = np.linspace(0.0, 2.0, 101)
-    times, traj = solver.solve(f, t_span, np.array([1.0]), params={}, t_eval=t_eval)
-    # analytic solution exp(-t)
+    eq = "{x'[t], y'[t]} == {k^2*x[t], c - y[t]}"
+    f_generic, _ = p.parse(eq)
+    f_baked, _ = p.parse(eq, params={"k": -0.5})
+    y = np.array([2.0, 1.0])
+    params = {"k": -0.5, "c": 3.0}
+    # negative constants keep their precedence under ^; unbaked "c" is still looked up
+    npt.assert_allclose(f_baked(0.0, y, {"c": 3.0}), f_generic(0.0, y, params), atol=1e-12)
+    npt.assert_allclose(f_baked(0.0, y, {"c": 3.0}), np.array([0.5, 2.0]), atol=1e-12)
+
+
+@pytest.fixture(scope="module")
+def decay_t_eval():
+    return np.linspace(0.0, 2.0, 201)
+
+
+@pytest.mark.parametrize(
+    "solver_factory,rtol,atol",
+    [
+        (lambda mods: mods["scipy"].ScipySolver(mods["abstract"].IntegratorOptions(method="RK45")), 1e-5, 1e-7),
+        # RK4 on the fixed grid (pure-Python path for a plain callable); looser than SciPy
+        (lambda mods: mods["numba"].NumbaRunner(), 5e-4, 1e-4),
+    ],
+    ids=["scipy-rk45", "numba-rk4"],
+)
+def test_solver_exp_decay(solver_factory, rtol, atol, abstract_mod, scipy_mod, numba_mod, compiled_rhs, decay_t_eval):
+    solver = solver_factory({"abstract": abstract_mod, "scipy": scipy_mod, "numba": numba_mod})
+    times, traj = solver.solve(compiled_rhs["decay"][0], (0.0, 2.0), np.array([1.0]), params={}, t_eval=decay_t_eval)
+    # analytic solution exp(-t); traj shape (nt, ndim)
+    assert traj.shape == (times.size, 1)
     expected = np.exp(-times)
-    # traj shape (nt, ndim)
-    npt.assert_allclose(traj.flatten(), expected, rtol=1e-5, atol=1e-7)
+    # cheap vectorized check first; assert_allclose only runs to format the failure report
+    if not np.allclose(traj[:, 0], expected, rtol=rtol, atol=atol):
+        npt.assert_allclose(traj[:, 0], expected, rtol=rtol, atol=atol)
 
 
-def test_numba_runner_rk4_accuracy():
-    # Uses pure-Python RK4 integrator provided by NumbaRunner (numba optional)
-    parser_mod = load_module_from_path("parser", "backend/parser/parser.py")
-    nr_mod = load_module_from_path("numba_runner", "backend/solvers/numba_runner.py")
+def test_numba_runner_rk4_njit_harness_decoupled_decay(numba_mod):
+    if not numba_mod.NUMBA_AVAILABLE:
+        pytest.skip("numba not installed")
+    from numba import njit
 
-    MathematicaParser = parser_mod.MathematicaParser
-    NumbaRunner = nr_mod.NumbaRunner
+    # K independent decays in one jitted solve: one integrator call checks K columns
+    @njit
+    def rhs(t, y, p):
+        return -y
 
-    p = MathematicaParser()
-    f, vars_ = p.parse("x'[t] == -x[t]")
-    runner = NumbaRunner()
-    t_span = (0.0, 2.0)
+    y0 = np.linspace(0.5, 4.0, 8)
     t_eval = np.linspace(0.0, 2.0, 201)
-    times, traj = runner.solve(f, t_span, np.array([1.0]), params={}, t_eval=t_eval)
-    expected = np.exp(-times)
-    # RK4 with fine grid should be reasonably accurate; allow looser tolerance than SciPy
-    npt.assert_allclose(traj.flatten(), expected, rtol=5e-4, atol=1e-4)
\ No newline at end of file
+    times, traj = numba_mod.NumbaRunner().solve(rhs, (0.0, 2.0), y0, t_eval=t_eval)
+    assert traj.shape == (t_eval.size, y0.size)
+    npt.assert_allclose(traj, y0 * np.exp(-times)[:, None], rtol=5e-4, atol=1e-4)
+
+
+def test_parser_batched_states_broadcast(parser_mod):
+    p = parser_mod.MathematicaParser()
+
+    # constant component must broadcast against the grid-shaped component
+    f, vars_ = p.parse("{x'[t], y'[t]} == {1, x[t]*y[t]}")
+    Y = np.array([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]])
+    out = f(0.0, Y, {})
+    assert out.shape == (2, 3)
+    npt.assert_allclose(out[0], np.ones(3))
+    npt.assert_allclose(out[1], Y[0] * Y[1])
+
+    # no component depends on the state: still one value per state in the batch
+    f_const, _ = p.parse("{x'[t], y'[t]} == {1, 2*k}")
+    out = f_const(0.0, Y, {"k": 1.5})
+    assert out.shape == (2, 3)
+    npt.assert_allclose(out, np.array([[1.0] * 3, [3.0] * 3]))
+    npt.assert_allclose(f_const(0.0, np.array([1.0, 4.0]), {"k": 1.5}), np.array([1.0, 3.0]))
+
+
+def test_parser_numba_kernel_matches_numpy_callable(parser_mod):
+    if not parser_mod.NUMBA_AVAILABLE:
+        pytest.skip("numba not installed")
+    p = parser_mod.MathematicaParser()
+
+    eq = "{x'[t], y'[t]} == {a*x[t] - y[t], x[t]^2*y[t] + 1}"
+    f, vars_ = p.parse(eq)
+    kernel, vars_nb, param_names = p.parse_numba(eq)
+    assert vars_nb == vars_
+    assert param_names == ["a"]
+
+    params = {"a": 0.5}
+    y = np.array([1.0, 3.0])
+    npt.assert_allclose(kernel(0.0, y, parser_mod.pack_params(param_names, params)), f(0.0, y, params), atol=1e-12)
+
+
+def test_numba_runner_batch_matches_single_solves(parser_mod, numba_mod):
+    p = parser_mod.MathematicaParser()
+    f, vars_ = p.parse("{x'[t], y'[t]} == {y[t], -x[t] + 0.5}")
+    runner = numba_mod.NumbaRunner()
+    t_eval = np.linspace(0.0, 1.0, 51)
+    y0_batch = np.array([[1.0, 0.0], [0.0, 1.0], [2.0, -1.0]])
+
+    times, trajs = runner.solve_batch(f, (0.0, 1.0), y0_batch, params={}, t_eval=t_eval)
+    assert trajs.shape == (3, t_eval.size, 2)
+    for i in range(y0_batch.shape[0]):
+        _, single = runner.solve(f, (0.0, 1.0), y0_batch[i], params={}, t_eval=t_eval)
+        npt.assert_allclose(trajs[i], single, atol=1e-12)
+
+
+def test_numba_runner_jitted_rhs_matches_python_rhs(parser_mod, numba_mod):
+    if not numba_mod.NUMBA_AVAILABLE:
+        pytest.skip("numba not installed")
+
+    p = parser_mod.MathematicaParser()
+    eq = "{x'[t], y'[t]} == {y[t], -w*x[t]}"
+    f, _ = p.parse(eq)
+    kernel, _, _ = p.parse_numba(eq)
+    runner = numba_mod.NumbaRunner()
+    t_eval = np.linspace(0.0, 2.0, 101)
+    y0 = np.array([1.0, 0.0])
+    params = {"w": 4.0}
+
+    _, traj_py = runner.solve(f, (0.0, 2.0), y0, params=params, t_eval=t_eval)
+    _, traj_nb = runner.solve(kernel, (0.0, 2.0), y0, params=params, t_eval=t_eval)
+    npt.assert_allclose(traj_nb, traj_py, rtol=1e-12, atol=1e-12)
+
+
+def test_numba_runner_parallel_batch_matches_single_solves(parser_mod, numba_mod):
+    if not numba_mod.NUMBA_AVAILABLE:
+        pytest.skip("numba not installed")
+
+    kernel, _, _ = parser_mod.MathematicaParser().parse_numba("{x'[t], y'[t]} == {y[t], -w*x[t]}")
+    runner = numba_mod.NumbaRunner()
+    t_eval = np.linspace(0.0, 1.0, 51)
+    y0_batch = np.array([[1.0, 0.0], [0.0, 1.0], [2.0, -1.0], [0.5, 0.5]])
+    params = {"w": 3.0}
+
+    times, trajs = runner.solve_batch(kernel, (0.0, 1.0), y0_batch, params=params, t_eval=t_eval)
+    assert trajs.shape == (4, t_eval.size, 2)
+    for i in range(y0_batch.shape[0]):
+        _, single = runner.solve(kernel, (0.0, 1.0), y0_batch[i], params=params, t_eval=t_eval)
+        npt.assert_allclose(trajs[i], single, atol=1e-12)
+
+
+def test_numba_runner_simd_batch_matches_parallel_batch(parser_mod, numba_mod):
+    if not numba_mod.NUMBA_AVAILABLE:
+        pytest.skip("numba not installed")
+
+    eq = "{x'[t], y'[t]} == {y[t], -w*Sin(x[t])}"
+    parser = parser_mod.MathematicaParser()
+    kernel, _, _ = parser.parse_numba(eq)
+    lanes_kernel, _, _ = parser.parse_numba(eq, lanes=True)
+    runner = numba_mod.NumbaRunner()
+    t_eval = np.linspace(0.0, 1.0, 51)
+    # 11 ICs: not a multiple of the tile width, so the last tile is padded
+    y0_batch = np.column_stack([np.linspace(-2.0, 2.0, 11), np.linspace(1.0, -1.0, 11)])
+    params = {"w": 3.0}
+
+    _, expected = runner.solve_batch(kernel, (0.0, 1.0), y0_batch, params=params, t_eval=t_eval)
+    times, trajs = runner.solve_batch_simd(lanes_kernel, (0.0, 1.0), y0_batch, params=params, t_eval=t_eval, width=4)
+    npt.assert_allclose(times, t_eval)
+    assert trajs.shape == (11, t_eval.size, 2)
+    npt.assert_allclose(trajs, expected, atol=1e-12)
+
+
+def test_numba_runner_vectorized_events_match_per_sample_events(numba_mod):
+    def f(t, y, params):
+        return np.array([y[1], -y[0]])
+
+    def g(t, y):
+        return y[0]
+
+    def g_vec(times, traj):
+        return traj[:, 0]
+
+    g_vec.vectorized = True
+
+    runner = numba_mod.NumbaRunner()
+    t_eval = np.linspace(0.0, 10.0, 401)
+    runner.solve(f, (0.0, 10.0), np.array([1.0, 0.0]), t_eval=t_eval, events=[g, g_vec])
+    per_sample, vectorized = runner._last_events
+    # cos(t) crosses zero at pi/2, 3pi/2, 5pi/2 on [0, 10]
+    assert len(per_sample) == 3
+    assert per_sample == vectorized
+
+
+def test_scipy_solver_numbalsoda_fast_path(parser_mod, scipy_mod):
+    if not (parser_mod.NUMBA_AVAILABLE and scipy_mod.NUMBALSODA_AVAILABLE):
+        pytest.skip("numba / numbalsoda not installed")
+
+    rhs, _, names = parser_mod.MathematicaParser().parse_lsoda("x'[t] == -k*x[t]")
+    assert names == ["k"]
+    solver = scipy_mod.ScipySolver(scipy_mod.IntegratorOptions(method="LSODA", rtol=1e-8, atol=1e-10))
+    t_eval = np.linspace(0.0, 2.0, 21)
+    times, traj = solver.solve(rhs, (0.0, 2.0), np.array([1.0]), params={"k": 0.5}, t_eval=t_eval)
+    npt.assert_allclose(times, t_eval)
+    npt.assert_allclose(traj[:, 0], np.exp(-0.5 * t_eval), rtol=1e-6)
+
+
+@pytest.mark.parametrize("method", ["LSODA", "DOP853"])
+def test_scipy_solver_numbalsoda_matches_solve_ivp_for_offset_t_eval(parser_mod, scipy_mod, method):
+    if not (parser_mod.NUMBA_AVAILABLE and scipy_mod.NUMBALSODA_AVAILABLE):
+        pytest.skip("numba / numbalsoda not installed")
+
+    eq = "{x'[t], y'[t]} == {y[t], -k*x[t]}"
+    parser = parser_mod.MathematicaParser()
+    rhs_lsoda, _, _ = parser.parse_lsoda(eq)
+    rhs_py, _ = parser.parse(eq)
+    solver = scipy_mod.ScipySolver(scipy_mod.IntegratorOptions(method=method, rtol=1e-9, atol=1e-11))
+    # output grid starts after t0: the initial condition still applies at t0
+    t_eval = np.linspace(0.5, 3.0, 26)
+    y0, params = np.array([1.0, 0.0]), {"k": 4.0}
+
+    times, fast = solver.solve(rhs_lsoda, (0.0, 3.0), y0, params=params, t_eval=t_eval)
+    _, expected = solver.solve(rhs_py, (0.0, 3.0), y0, params=params, t_eval=t_eval)
+    npt.assert_allclose(times, t_eval)
+    npt.assert_allclose(fast, expected, atol=1e-6)
+    npt.assert_allclose(fast[:, 0], np.cos(2.0 * t_eval), atol=1e-6)
+
+
+def test_scipy_solver_passes_float64_state_to_rhs(scipy_mod):
+    # ScipySolver hands solve_ivp's y straight to the RHS; check it is always a float64 array
+
+    def f(t, y, params):
+        assert isinstance(y, np.ndarray) and y.dtype == np.float64
+        return -y
+
+    for method in ("RK45", "DOP853", "Radau", "BDF"):
+        solver = scipy_mod.ScipySolver(scipy_mod.IntegratorOptions(method=method))
+        # integer initial conditions must not leak into the RHS as an int array
+        _, traj = solver.solve(f, (0.0, 1.0), np.array([1, 2]), t_eval=np.linspace(0.0, 1.0, 11))
+        npt.assert_allclose(traj[-1], np.exp(-1.0) * np.array([1.0, 2.0]), rtol=1e-3)
+
+
+def test_scipy_solver_joint_batch_matches_serial_batch(parser_mod, scipy_mod):
+    f, _ = parser_mod.MathematicaParser().parse("{x'[t], y'[t]} == {y[t], -x[t] - 0.1*y[t]}")
+    y0_batch = np.array([[1.0, 0.0], [0.0, 1.0], [-2.0, 0.5]])
+    t_eval = np.linspace(0.0, 5.0, 51)
+    opts = dict(rtol=1e-9, atol=1e-12)
+    serial = scipy_mod.ScipySolver(scipy_mod.IntegratorOptions(**opts))
+    joint = scipy_mod.ScipySolver(scipy_mod.IntegratorOptions(extras={"joint_batch": True}, **opts))
+
+    _, expected = serial.solve_batch(f, (0.0, 5.0), y0_batch, t_eval=t_eval)
+    times, trajs = joint.solve_batch(f, (0.0, 5.0), y0_batch, t_eval=t_eval)
+    assert trajs.shape == (3, t_eval.size, 2)
+    npt.assert_allclose(trajs, expected, atol=1e-7)
+
+    # an RHS that only accepts a single state goes through the per-IC loop
+    def f_scalar(t, y, params):
+        assert y.shape == (2,)
+        return np.array([y[1], -y[0] - 0.1 * y[1]])
+
+    _, looped = joint.solve_batch_joint(f_scalar, (0.0, 5.0), y0_batch, t_eval=t_eval)
+    npt.assert_allclose(looped, expected, atol=1e-7)
+
+
+def test_numba_runner_unrolled_kernel_matches_generic_loop(parser_mod, numba_mod):
+    if not numba_mod.NUMBA_AVAILABLE:
+        pytest.skip("numba not installed")
+
+    kernel, _, _ = parser_mod.MathematicaParser().parse_numba("{x'[t], y'[t], z'[t]} == {y[t], -x[t], -z[t]*x[t]}")
+    t_eval = np.linspace(0.0, 2.0, 41)
+    y0 = np.array([1.0, 0.5, 2.0])
+    single, _ = numba_mod._unrolled_rk4(3)
+    assert numba_mod._unrolled_rk4(3)[0] is single  # generated once per ndim
+    expected = numba_mod._rk4_integrate_nb(kernel, 0.0, t_eval, y0, np.empty(0), np.empty((41, 3)))
+    unrolled = single(kernel, 0.0, t_eval, y0, np.empty(0), np.empty((41, 3)))
+    npt.assert_array_equal(unrolled, expected)
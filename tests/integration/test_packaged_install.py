@@ -1,32 +1,69 @@
+import fcntl
+import hashlib
 import os
+import re
 import shutil
 import signal
+import socket
 import subprocess
 import sys
 import tempfile
 import time
 from pathlib import Path
+from typing import TYPE_CHECKING, Optional
 
-import requests
+import pytest
+
+if TYPE_CHECKING:
+    import requests
 
 WHEEL_GLOB = "dist/*.whl"
 BUILD_SCRIPT = "scripts/build_release.sh"
+STATIC_INDEX = "backend/static/index.html"
+# dependency wheels pre-fetched by the CI test step (pip wheel --wheel-dir build/wheelhouse);
+# kept out of dist/, which is uploaded as the release artifact
+WHEELHOUSE_DIR = "build/wheelhouse"
+VENV_CACHE_DIR = "eqpp_test_venv"
+MIN_PIP_VERSION = (23, 0)
 
-def find_wheel(repo_root: Path) -> Path:
-    d = repo_root / "dist"
-    for p in sorted(d.glob("*.whl")):
-        return p
-    return None
+def find_wheel(repo_root: Path) -> Optional[Path]:
+    # freshest artifact wins, so a stale wheel left in dist/ is not picked up after a rebuild
+    return max((repo_root / "dist").glob("*.whl"), key=lambda p: p.stat().st_mtime, default=None)
 
 def create_venv(venv_dir: Path):
+    if shutil.which("uv"):
+        # uv creates the venv in well under a second and needs no pip inside it
+        subprocess.check_call(["uv", "venv", "--python", sys.executable, str(venv_dir)])
+        return
     subprocess.check_call([sys.executable, "-m", "venv", str(venv_dir)])
-    # ensure pip is up to date
+    # only upgrade an old bundled pip (a network round-trip otherwise); setuptools/wheel are
+    # not needed to install a wheel
     pip = venv_dir / "bin" / "pip"
-    subprocess.check_call([str(pip), "install", "--upgrade", "pip", "setuptools", "wheel"])
+    version = subprocess.check_output([str(pip), "--version"]).decode().split()[1]
+    # major.minor only, so pre-releases like "24.1b1" parse too
+    if tuple(map(int, re.match(r"(\d+)\.(\d+)", version).groups())) < MIN_PIP_VERSION:
+        subprocess.check_call([str(pip), "install", "--upgrade", "pip"])
 
-def install_wheel(venv_dir: Path, wheel_path: Path):
-    pip = venv_dir / "bin" / "pip"
-    subprocess.check_call([str(pip), "install", str(wheel_path)])
+def install_wheel(venv_dir: Path, wheel_path: Path, wheelhouse: Optional[Path] = None):
+    if shutil.which("uv"):
+        install = ["uv", "pip", "install", "--python", str(venv_dir / "bin" / "python")]
+    else:
+        install = [str(venv_dir / "bin" / "pip"), "install"]
+    # with a local wheelhouse of the dependencies, install offline from local disk
+    if wheelhouse is not None and wheelhouse.is_dir():
+        offline = ["--no-index", "--find-links", str(wheel_path.parent), "--find-links", str(wheelhouse)]
+        try:
+            subprocess.check_call(install + offline + [str(wheel_path)])
+            return
+        except subprocess.CalledProcessError:
+            pass  # incomplete wheelhouse: resolve the rest from the index
+    subprocess.check_call(install + [str(wheel_path)])
+
+def free_port(host: str = "127.0.0.1") -> int:
+    # let the OS pick an unused port; the tiny window before the server binds it is acceptable
+    with socket.socket() as s:
+        s.bind((host, 0))
+        return s.getsockname()[1]
 
 def start_server(venv_dir: Path, host="127.0.0.1", port=8001):
     python = venv_dir / "bin" / "python"
@@ -36,51 +73,117 @@ def start_server(venv_dir: Path, host="127.0.0.1", port=8001):
     # ensure PATH includes venv bin
     env["PATH"] = str(venv_dir / "bin") + os.pathsep + env.get("PATH", "")
     cmd = [str(python), "-m", "backend.cli", "--host", host, "--port", str(port)]
-    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env, text=True)
+    # the test only talks HTTP; undrained PIPEs would stall a chatty server once ~64KB is buffered
+    proc = subprocess.Popen(
+        cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=env, close_fds=True
+    )
     return proc
 
-def wait_for_health(url: str, timeout: float = 15.0):
-    deadline = time.time() + timeout
-    while time.time() < deadline:
+def wait_for_health(session: "requests.Session", url: str, timeout: float = 15.0):
+    deadline = time.monotonic() + timeout
+    # exponential backoff: notice a fast-booting server within tens of ms,
+    # without hammering a slow one
+    delay = 0.01
+    while time.monotonic() < deadline:
         try:
-            r = requests.get(url, timeout=1.0)
+            r = session.get(url, timeout=0.5)
             if r.status_code == 200 and r.json().get("status") == "ok":
                 return True
         except Exception:
             pass
-        time.sleep(0.5)
+        time.sleep(delay)
+        delay = min(delay * 1.7, 0.2)
     return False
 
-def test_packaged_wheel_serves_static_and_health(tmp_path: Path):
+def build_wheel(repo_root: Path):
+    # With the SPA already copied into backend/static only the wheel step is needed; run it
+    # through the PEP 517 API instead of the full release script (npm ci + frontend build).
+    if (repo_root / STATIC_INDEX).exists():
+        try:
+            from build import ProjectBuilder
+
+            builder = ProjectBuilder(str(repo_root))
+            # no isolated env here, so the backend requirements must already be installed
+            if not builder.check_dependencies("wheel"):
+                builder.build("wheel", str(repo_root / "dist"))
+                return
+        except Exception:
+            pass  # build not installed or the backend failed: use the script
+    build_script = repo_root / BUILD_SCRIPT
+    assert build_script.exists(), f"Build script not found at {build_script}"
+    subprocess.check_call(["bash", str(build_script)], cwd=str(repo_root))
+
+@pytest.fixture(scope="session")
+def packaged_wheel() -> Path:
     repo_root = Path(__file__).resolve().parents[2]
     wheel = find_wheel(repo_root)
-    # If wheel is not present, attempt to build using the provided script (CI should already build)
+    # If wheel is not present, attempt to build it (CI should already build)
     if wheel is None:
-        build_script = repo_root / BUILD_SCRIPT
-        assert build_script.exists(), f"Build script not found at {build_script}"
-        subprocess.check_call(["bash", str(build_script)], cwd=str(repo_root))
+        build_wheel(repo_root)
         wheel = find_wheel(repo_root)
     assert wheel is not None, "Wheel artifact not found in dist/ after build"
+    return wheel
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
 
-    venv_dir = tmp_path / "venv"
-    create_venv(venv_dir)
-    install_wheel(venv_dir, wheel)
+@pytest.fixture(scope="session")
+def shared_venv(packaged_wheel: Path) -> Path:
+    """
+    Venv with the wheel installed, kept in the system temp dir across pytest runs. The path
+    is keyed by the wheel's sha256, so a new wheel (e.g. after scripts/build_release.sh) gets
+    a new venv and a finished venv is never rebuilt under another run that is using it.
+    """
+    digest = _sha256(packaged_wheel)
+    venv_dir = Path(tempfile.gettempdir()) / f"{VENV_CACHE_DIR}-{digest[:16]}"
+    stamp = venv_dir / ".wheel_sha"
+    # concurrent runs (xdist workers, other checkouts, parallel CI jobs) wait here while one
+    # of them builds the venv
+    with open(venv_dir.with_name(venv_dir.name + ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if not (stamp.exists() and stamp.read_text() == digest):
+            shutil.rmtree(venv_dir, ignore_errors=True)
+            create_venv(venv_dir)
+            install_wheel(venv_dir, packaged_wheel, packaged_wheel.parents[1] / WHEELHOUSE_DIR)
+            # written last: an interrupted build is redone on the next run
+            stamp.write_text(digest)
+    return venv_dir
 
-    # Start server on a non-default port to avoid conflicts in CI
+
+# Process/I-O bound (venv, pip, server boot): under `pytest -n auto --dist loadgroup` it runs
+# on its own worker while the CPU-bound backend tests are spread over the others.
+@pytest.mark.xdist_group("packaged_wheel")
+def test_packaged_wheel_serves_static_and_health(shared_venv: Path):
+    venv_dir = shared_venv
+
+    # Start server on a free ephemeral port so a busy port (or a parallel run) cannot collide
     host = "127.0.0.1"
-    port = 8001
+    port = free_port(host)
     proc = start_server(venv_dir, host=host, port=port)
 
+    # imported here so collecting (or deselecting) this module does not pay for requests
+    import requests
+
+    # one keep-alive connection pool for the health polls and the SPA check
+    session = requests.Session()
+    session.mount("http://", requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=2))
     try:
         health_url = f"http://{host}:{port}/health"
-        assert wait_for_health(health_url, timeout=20.0), "Server did not become healthy in time"
+        assert wait_for_health(session, health_url, timeout=20.0), "Server did not become healthy in time"
 
         # Verify root serves index.html (static SPA)
         root_url = f"http://{host}:{port}/"
-        r = requests.get(root_url, timeout=5.0)
+        r = session.get(root_url, timeout=5.0)
         assert r.status_code == 200
         assert "<!DOCTYPE html>" in r.text or "<html" in r.text.lower()
     finally:
+        session.close()
         # terminate server
         try:
             proc.send_signal(signal.SIGINT)